@@ -1,7 +1,6 @@
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 import os
-import google.generativeai as genai
 from pydantic import BaseModel
 from dotenv import load_dotenv
 import logging
@@ -9,14 +8,31 @@ import logging
 # from fastapi.responses import FileResponse
 
 # --- Imports for DB QA System ---
-import faiss
-from sentence_transformers import SentenceTransformer
+import numpy as np
 from fastapi import Request
-from course_db_data import get_courses_data
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from course_catalog import CourseCatalog
+from course_db_data import close_client
+from llm_client import is_truncated, llm
+from response_cache import cache_key, response_cache
+from prompt_budget import COURSE_FIELD_MAX_TOKENS, COURSE_LIST_MAX_TOKENS, OUTPUT_BUDGETS, Prompt, cap_user_input, extract_sentences, fit_items
+from semantic_cache import SemanticCache
+from course_search import CourseSearchEngine
+from index_factory import build_index, index_variant
+from lecture_index import LectureIndexManager
+from index_snapshot import catalog_hash, load_snapshot, save_snapshot, snapshot_name
+from model_registry import ModelRegistry
+from occupation_extractor import OccupationExtractor, load_spacy_pipeline
+from metrics import MetricsMiddleware, render_metrics, rss_bytes, span
+from single_flight import SingleFlight
+from embedding_backend import create_embedding_backend, embedding_variant
+from retrieval_service import RETRIEVAL_SERVICE_SOCKET, RetrievalClient
 import re
+import json
+import math
+import asyncio
 
 # --- Imports for Roadmap Generation ---
-import spacy
 from typing import List
 
 # --- Imports for executing .py files within same directory ---
@@ -31,11 +47,26 @@ load_dotenv()
 # Initialize FastAPI app
 app = FastAPI()
 
+# Heavy models and indexes are loaded lazily or by the startup warm-up, not at import
+registry = ModelRegistry()
+
+# With gunicorn --preload, PRELOAD_MODELS=1 loads model weights once in the master so
+# workers share them copy-on-write. The course index is still loaded per worker, from
+# the memory-mapped snapshot when one exists.
+PRELOAD_MODELS = os.getenv("PRELOAD_MODELS", "0") == "1"
+
 # --- Excecute .py files within same directory ---
 @app.on_event("startup")
 def startup_tasks():
+    registry.start_warm_up()
     logging.info("✅ Startup tasks initialized.")
 
+@app.on_event("shutdown")
+def shutdown_tasks():
+    catalog.stop()
+    close_client()
+    response_cache.close()
+
 @app.get("/")
 async def root():
     return {"message": "Hello, User!"}
@@ -44,6 +75,18 @@ async def root():
 async def health_check():
     return {"status": "ok"}
 
+@app.get("/readyz")
+async def readiness_check():
+    status = {"status": "ready" if registry.ready() else "loading", "resources": registry.status()}
+    if not registry.ready():
+        return JSONResponse(status_code=503, content=status)
+    return status
+
+@app.get("/metrics")
+async def metrics():
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
 # Add CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -59,11 +102,14 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Request latency per route; send X-Server-Timing (or set SERVER_TIMING=1) for per-stage timings
+app.add_middleware(MetricsMiddleware)
+
 # Set your Gemini API key from environment variable
 GEMINI_API_KEY = os.getenv('GEMINI_API_KEY')
 
-# Configure the Gemini API client
-genai.configure(api_key=GEMINI_API_KEY)
+# Configure the shared Gemini API client
+llm.configure(GEMINI_API_KEY)
 
 # Define Pydantic models for request validation
 class Parameters(BaseModel):
@@ -79,7 +125,68 @@ class RequestBody(BaseModel):
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 
+# --- Streaming helpers ---
+def get_stream_format(request: Request, data=None):
+    """Return "sse" or "ndjson" when the client opted into streaming, otherwise None."""
+    accept = request.headers.get("accept", "")
+    if "text/event-stream" in accept:
+        return "sse"
+    if "application/x-ndjson" in accept:
+        return "ndjson"
+    flag = request.query_params.get("stream") or (data or {}).get("stream")
+    if flag in (True, "true", "1", "sse"):
+        return "sse"
+    if flag == "ndjson":
+        return "ndjson"
+    return None
+
+def encode_stream_event(stream_format, event, payload) -> str:
+    if stream_format == "sse":
+        return f"event: {event}\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n"
+    return json.dumps({"event": event, **payload}, ensure_ascii=False) + "\n"
+
+async def cached_text_chunks(text):
+    yield text
+
+def stream_llm_response(stream_format, chunks, build_payload, on_complete=None):
+    """Forward text chunks as "delta" events, then send the usual JSON payload as a final "done" event."""
+    async def events():
+        parts = []
+        try:
+            async for text in chunks:
+                parts.append(text)
+                yield encode_stream_event(stream_format, "delta", {"text": text})
+            full_text = "".join(parts).strip()
+            if on_complete is not None:
+                await on_complete(full_text)
+            yield encode_stream_event(stream_format, "done", build_payload(full_text))
+        except Exception as e:
+            logging.warning(f"Streaming response failed: {e}")
+            yield encode_stream_event(stream_format, "error", {"error": str(e)})
+
+    media_type = "text/event-stream" if stream_format == "sse" else "application/x-ndjson"
+    return StreamingResponse(events(), media_type=media_type, headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+def dialogflow_payload(text):
+    return {
+        "fulfillmentMessages": [
+            {
+                "text": {
+                    "text": [text]
+                }
+            }
+        ]
+    }
+
 # --- Handle User Greetings ---
+# Static instructions go in the system instruction so every call shares the same cacheable prefix
+GREET_INSTRUCTION = (
+    "If the user's message is a greeting or friendly message (like hi, hello, hey, good morning, etc), reply with a warm, casual 1–2 sentence greeting. (e.g., 'Hi User! How can I help you today?') "
+    "Sound human, not robotic. Vary responses. "
+    "You’re NexGenie — an AI that helps with coding, tech questions, roadmaps, and course advice. "
+    "Casually mention 1–2 of those in your reply. Don’t explain what the user said."
+)
+
 @app.post("/greet")
 async def greet(request: Request):
     try:
@@ -90,18 +197,9 @@ async def greet(request: Request):
             return {"error": "No input provided."}
 
         # Gemini prompt to detect and respond to any kind of greeting
-        prompt = (
-            f"The user said: '{user_input}'.\n"
-            "If it's a greeting or friendly message (like hi, hello, hey, good morning, etc), reply with a warm, casual 1–2 sentence greeting. (e.g., 'Hi User! How can I help you today?') "
-            "Sound human, not robotic. Vary responses. "
-            "You’re NexGenie — an AI that helps with coding, tech questions, roadmaps, and course advice. "
-            "Casually mention 1–2 of those in your reply. Don’t explain what the user said."
-        )
+        prompt = Prompt("greet", GREET_INSTRUCTION, f"The user said: '{cap_user_input(user_input)}'.")
 
-        model = genai.GenerativeModel("gemini-2.0-flash")
-        response = model.generate_content(prompt)
-
-        reply = response.text.strip()
+        reply = await llm.generate_text(prompt)
 
         return {
             "fulfillmentMessages": [
@@ -118,21 +216,28 @@ async def greet(request: Request):
 
 
 # --- Process General Query and Coding Questions ---
+CODE_SNIPPET_INSTRUCTION = (
+    "The response should be formatted as a clean, well-structured code snippet, similar to how it would appear in a code editor."
+)
+
 @app.post("/process_query")
-async def process_query(request_body: RequestBody):
+async def process_query(request_body: RequestBody, request: Request):
     code = request_body.queryResult.parameters.code
     programminglanguage = request_body.queryResult.parameters.programminglanguage
 
     try:
-        # Create a generative model
-        model = genai.GenerativeModel("gemini-2.0-flash")
-        
         # Generate content based on the user's input
-        prompt = (
-            f"Generate a {programminglanguage} code snippet that performs the following task: '{code}'. "
-            "The response should be formatted as a clean, well-structured code snippet, similar to how it would appear in a code editor."
+        prompt = Prompt(
+            "process_query",
+            CODE_SNIPPET_INSTRUCTION,
+            f"Generate a {cap_user_input(programminglanguage, 16)} code snippet that performs the following task: '{cap_user_input(code)}'.",
         )
-        response = model.generate_content(prompt)
+
+        stream_format = get_stream_format(request)
+        if stream_format:
+            return stream_llm_response(stream_format, llm.stream_text(prompt), dialogflow_payload)
+
+        reply = await llm.generate_text(prompt)
         
         # Return the generated text as a text message for Dialogflow
         return {
@@ -140,7 +245,7 @@ async def process_query(request_body: RequestBody):
                 {
                     "text": {
                         "text": [
-                            response.text.strip()
+                            reply
                         ]
                     }
                 }
@@ -152,23 +257,51 @@ async def process_query(request_body: RequestBody):
 
 
 # --- Embed Courses Data ---
-embedder = SentenceTransformer("paraphrase-MiniLM-L6-v2")
+# With RETRIEVAL_SERVICE_SOCKET set, the embedding model and spaCy live in the shared
+# retrieval service process and this worker only holds a client for it
+retrieval_client = RetrievalClient() if RETRIEVAL_SERVICE_SOCKET else None
+
+def connect_retrieval_service():
+    retrieval_client.dimension  # Blocks until the service is up
+    return retrieval_client
+
+# EMBEDDING_BACKEND picks SentenceTransformer (torch), ONNX Runtime or int8-quantized ONNX
+registry.register("embedder", connect_retrieval_service if retrieval_client else create_embedding_backend)
+
+def get_embedder():
+    return registry.get("embedder")
+
+def encode_texts(texts) -> np.ndarray:
+    embedder = get_embedder()
+    with span("embedding_encode"):
+        return embedder.encode(texts)
+
+async def aencode_texts(texts) -> np.ndarray:
+    """Encode without blocking the event loop (in a thread, or on the retrieval service)."""
+    embedder = await registry.aget("embedder")
+    with span("embedding_encode"):
+        return await embedder.aencode(texts)
+
+# Reuses answers to paraphrased questions (per-endpoint namespaces)
+semantic_cache = SemanticCache(encode_texts, aencode=aencode_texts)
 
 # Store data and index
 course_chunks = []
 course_metadata = []
 index = None
 
-def load_courses_data():
-    global course_chunks, course_metadata, index
-    courses = get_courses_data()  # Fetch courses from MongoDB
+# Startup embeddings, reused per request instead of re-encoding courses
+course_embeddings = None  # (n_courses, dim) float32 matrix, row i <-> course_ids[i]
+course_ids = []
+course_store = {}  # course id -> {"row": flattened course, "position": row in course_embeddings}
+course_search = None  # CourseSearchEngine over the same rows and index
+course_index_lock = threading.Lock()
 
-    # Convert each course to a "chunk" of information
-    course_chunks = []
-    course_metadata = []
+# In-memory course catalog, kept fresh from MongoDB change events
+catalog = CourseCatalog()
 
-    for row in courses:
-        chunk = f"""Course: {row['Name']}
+def build_course_chunk(row) -> str:
+    return f"""Course: {row['Name']}
 Description: {row['Description']}
 Tags: {row['Tags']}
 Category: {row['Category']}
@@ -176,19 +309,126 @@ Level: {row['Level']}
 Price: {row['Price']}
 Benefits: {row['Benefits']}
 Prerequisites: {row['Prerequisites']}"""
-        course_chunks.append(chunk)
-        course_metadata.append(row['Name'])
 
-    # Embed the chunks
-    embeddings = embedder.encode(course_chunks, convert_to_tensor=False)
+def encode_course_chunks(chunks):
+    if not chunks:
+        return np.empty((0, get_embedder().dimension), dtype="float32")
+    return encode_texts(chunks)
+
+def publish_course_index(rows, embeddings, new_index=None):
+    """Swap in a new course store, embedding matrix and FAISS index together.
+
+    Without ``new_index`` the index is built from ``embeddings`` and written to
+    an on-disk snapshot, which this worker then maps too, so every worker and
+    restart shares the same page-cache copy.
+    """
+    global course_chunks, course_metadata, index, course_embeddings, course_ids, course_store, course_search
+
+    new_store = {}
+    new_ids = []
+    for row in rows:
+        new_store[row['Id']] = {"row": row, "position": len(new_ids)}
+        new_ids.append(row['Id'])
+    new_chunks = [build_course_chunk(row) for row in rows]
+
+    # Create FAISS index (type and metric set by FAISS_INDEX_TYPE / FAISS_METRIC)
+    if new_index is None:
+        new_index = build_index(embeddings)
+        name = snapshot_name(embedding_variant(), catalog_hash(new_ids, new_chunks), index_variant())
+        save_snapshot(name, new_ids, embeddings, new_index, embedding_variant())
+        # Drop this worker's heap copy in favour of the shared mapping when the write succeeded
+        mapped = load_snapshot(name, new_ids)
+        if mapped is not None:
+            embeddings, new_index = mapped
+    new_search = CourseSearchEngine(rows, new_index)
+
+    with course_index_lock:
+        course_chunks = new_chunks
+        course_metadata = [row['Name'] for row in rows]
+        course_ids = new_ids
+        course_store = new_store
+        course_embeddings = embeddings
+        index = new_index
+        course_search = new_search
 
-    # Create FAISS index
-    dim = embeddings[0].shape[0]
-    index = faiss.IndexFlatL2(dim)
-    index.add(embeddings)
+def load_courses_data():
+    courses = catalog.load().rows  # Fetch courses from MongoDB
 
-# Call once on startup
-load_courses_data()
+    # Convert each course to a "chunk" of information
+    ids = [row['Id'] for row in courses]
+    chunks = [build_course_chunk(row) for row in courses]
+
+    # Map the snapshot for this exact catalog and model if one exists, otherwise embed and write it
+    snapshot = load_snapshot(snapshot_name(embedding_variant(), catalog_hash(ids, chunks), index_variant()), ids)
+    if snapshot is not None:
+        embeddings, snapshot_index = snapshot
+        logging.info(f"Loaded course index snapshot ({len(ids)} courses).")
+        publish_course_index(courses, embeddings, snapshot_index)
+    else:
+        publish_course_index(courses, encode_course_chunks(chunks))
+
+def apply_course_changes(changed_rows, deleted_ids):
+    """Re-embed only the changed courses and rebuild the index from the stored matrix."""
+    with course_index_lock:
+        store, embeddings = course_store, course_embeddings
+
+    changed_vectors = encode_course_chunks([build_course_chunk(row) for row in changed_rows])
+    pending = {row['Id']: i for i, row in enumerate(changed_rows)}
+    deleted = set(deleted_ids)
+
+    rows = []
+    vectors = []
+    for course_id, entry in store.items():
+        if course_id in deleted:
+            continue
+        if course_id in pending:
+            i = pending.pop(course_id)
+            rows.append(changed_rows[i])
+            vectors.append(changed_vectors[i])
+        else:
+            rows.append(entry["row"])
+            vectors.append(embeddings[entry["position"]])
+
+    # Courses that were not in the store yet go to the end
+    for i in pending.values():
+        rows.append(changed_rows[i])
+        vectors.append(changed_vectors[i])
+
+    matrix = np.vstack(vectors).astype("float32") if vectors else encode_course_chunks([])
+    publish_course_index(rows, matrix)
+    logging.info(f"Course index updated: {len(changed_rows)} re-embedded, {len(deleted)} removed.")
+
+def load_course_index():
+    load_courses_data()
+    # Only follow catalog changes once the full index exists, so no event is applied to a partial one
+    catalog.subscribe(apply_course_changes)
+    catalog.start()
+    return True
+
+registry.register("course_index", load_course_index)
+
+# --- Lecture-level index (one vector per lesson in coursedata) ---
+lecture_indexes = LectureIndexManager(encode_course_chunks)
+
+def load_lecture_index():
+    lecture_indexes.load()
+    catalog.subscribe(lecture_indexes.schedule_update)
+    return lecture_indexes
+
+# With the retrieval service the lecture index lives there, built once for all workers
+registry.register("lecture_index", retrieval_client.wait_for_lectures if retrieval_client else load_lecture_index)
+
+async def search_lectures(query: str, k: int) -> list:
+    # The first build can take minutes; answer 503 meanwhile rather than parking a thread per request on it
+    if not registry.is_loaded("lecture_index"):
+        registry.load_in_background("lecture_index")
+        status = registry.status()["lecture_index"]
+        detail = f"Lecture index unavailable: {status['error']}" if status["state"] == "error" else "Lecture index is still loading."
+        raise HTTPException(status_code=503, detail=detail, headers={"Retry-After": "5"})
+    if retrieval_client:
+        return await retrieval_client.asearch_lectures(query, k)
+    query_vec = await aencode_texts([query])
+    return lecture_indexes.current.search(query_vec, k=k)
 
 def format_price(price):
     try:
@@ -212,129 +452,209 @@ def extract_keywords(query: str) -> list:
     keywords = [token for token in tokens if token not in stop_words]
     return keywords
 
+# Words that may accompany "courses" in a request for the whole catalog ("list all courses")
+ALL_COURSES_WORDS = {"all", "list", "every", "your"}
+
+def is_all_courses_query(query: str) -> bool:
+    """True when the query asks for courses without naming a topic.
+
+    Decided on the raw tokens: extract_keywords drops "course"/"courses" as stop words.
+    """
+    tokens = re.findall(r'\w+', query.lower())
+    if "course" not in tokens and "courses" not in tokens:
+        return False
+    return all(keyword in ALL_COURSES_WORDS for keyword in extract_keywords(query))
+
+# --- Batched course summaries ---
+COURSE_SUMMARY_BATCH_SIZE = int(os.getenv("COURSE_SUMMARY_BATCH_SIZE", "5"))
+COURSE_SUMMARY_CONCURRENCY = int(os.getenv("COURSE_SUMMARY_CONCURRENCY", "4"))
+
+COURSE_SUMMARY_INSTRUCTION = (
+    "For each course in the JSON list you are given, summarize the description in 2 lines max, "
+    "the benefits in 2 lines max and the prerequisites briefly. "
+    "Return a JSON list with one object per course containing the keys "
+    "'id' (copied unchanged), 'description', 'benefits' and 'prerequisites'."
+)
+
+async def summarize_course_batch(rows) -> dict:
+    """Summarize description, benefits and prerequisites of several courses in one Gemini call."""
+    # Long course copy is cut down to its key sentences before it is sent
+    courses_json = json.dumps([
+        {
+            "id": row['Id'],
+            "description": extract_sentences(row['Description'], COURSE_FIELD_MAX_TOKENS),
+            "benefits": extract_sentences(row['Benefits'], COURSE_FIELD_MAX_TOKENS),
+            "prerequisites": extract_sentences(row['Prerequisites'], COURSE_FIELD_MAX_TOKENS),
+        }
+        for row in rows
+    ], ensure_ascii=False)
+    budget = OUTPUT_BUDGETS["course_summary"] * len(rows)
+    # Truncated JSON does not parse, so a cut-off answer is retried once with twice the budget
+    for max_output_tokens in (budget, 2 * budget):
+        prompt = Prompt("course_summary", COURSE_SUMMARY_INSTRUCTION, courses_json, max_output_tokens=max_output_tokens)
+        text = await llm.generate_text(prompt, generation_config={"response_mime_type": "application/json"})
+        if not is_truncated(text):
+            break
+    else:
+        raise ValueError(f"Course summaries for {len(rows)} courses exceeded {2 * budget} output tokens")
+    return {
+        str(item["id"]): item
+        for item in json.loads(text)
+        if isinstance(item, dict) and "id" in item
+    }
+
+def course_summary_key(row) -> str:
+    # Keyed on the summarized text itself, so an edited course never hits a stale entry
+    return cache_key("course_summary", llm.model_name, "\n".join([row['Description'], row['Benefits'], row['Prerequisites']]))
+
+async def summarize_courses(rows) -> dict:
+    """Summarize all courses in concurrent batches; failed batches are left out of the result."""
+    summaries = {}
+    pending = []
+    cached_summaries = await response_cache.aget_many([course_summary_key(row) for row in rows])
+    for row, cached in zip(rows, cached_summaries):
+        if cached is not None:
+            summaries[row['Id']] = json.loads(cached)
+        else:
+            pending.append(row)
+
+    semaphore = asyncio.Semaphore(COURSE_SUMMARY_CONCURRENCY)
+    batches = [pending[i:i + COURSE_SUMMARY_BATCH_SIZE] for i in range(0, len(pending), COURSE_SUMMARY_BATCH_SIZE)]
+
+    async def run(batch):
+        async with semaphore:
+            return await summarize_course_batch(batch)
+
+    outcomes = await asyncio.gather(*(run(batch) for batch in batches), return_exceptions=True)
+
+    writes = []
+    for batch, outcome in zip(batches, outcomes):
+        if isinstance(outcome, Exception):
+            logging.warning(f"Course summary batch of {len(batch)} failed: {outcome}")
+            continue
+        for row in batch:
+            summary = outcome.get(row['Id'])
+            if summary is not None:
+                writes.append(response_cache.aset(course_summary_key(row), json.dumps(summary), tag=f"course:{row['Id']}"))
+                summaries[row['Id']] = summary
+    await asyncio.gather(*writes)
+    return summaries
+
+def invalidate_course_summaries(changed_rows, deleted_ids):
+    for course_id in [row['Id'] for row in changed_rows] + list(deleted_ids):
+        response_cache.invalidate_tag(f"course:{course_id}")
+
+catalog.subscribe(invalidate_course_summaries)
+
+# Concurrent identical requests share one in-flight computation instead of repeating it
+llm_flights = SingleFlight("llm")
+request_flights = SingleFlight("request")
+
+async def cached_generate_text(endpoint: str, prompt: str, tag=None, **kwargs) -> str:
+    """Generate text through the shared LLM response cache; identical in-flight prompts share one call."""
+    key = cache_key(endpoint, llm.model_name, prompt)
+    cached = await response_cache.aget(key)
+    if cached is not None:
+        return cached
+    return await llm_flights.do(key, generate_and_cache, key, prompt, tag, **kwargs)
+
+async def generate_and_cache(key, prompt, tag=None, **kwargs) -> str:
+    text = await llm.generate_text(prompt, **kwargs)
+    # An answer cut off by max_output_tokens is returned, but not kept for everyone else
+    if not is_truncated(text):
+        await response_cache.aset(key, text, tag=tag)
+    return text
+
 # --- Helper: Answer based on MongoDB ---
-def answer_from_db(query: str, k: int = 3) -> list:
-    if index is None or not course_chunks:
+COURSE_LIST_SUMMARY_INSTRUCTION = (
+    "Write a 1-2 line summary of the given courses for someone interested in the given topic, "
+    "and make sure to clearly mention the topic in the summary."
+)
+
+def course_list_summary_prompt(topic: str, names) -> Prompt:
+    # Only as many course names as fit the budget; the full catalog listing can be long
+    course_list_text = "\n\n".join(fit_items(names, COURSE_LIST_MAX_TOKENS, "\n\n"))
+    return Prompt(
+        "course_query_summary",
+        COURSE_LIST_SUMMARY_INSTRUCTION,
+        f"Topic: '{cap_user_input(topic)}'\n\nCourses:\n\n{course_list_text}",
+    )
+
+async def answer_from_db(query: str, k: int = 3, filters=None, search_engine=None, dense_ids=None) -> list:
+    # Batch callers pass the engine they ran one FAISS search on, plus this query's row of ids
+    with course_index_lock:
+        store = course_store
+        search_engine = search_engine or course_search
+    if index is None or not store:
         return {"summary": "Course data not loaded.", "courses": []}
     
     # Check if the query is just asking for "courses"
     query_keywords = extract_keywords(query)
-    if len(query_keywords) == 1 and query_keywords[0] in ["courses", "course"]:
+    if is_all_courses_query(query):
         # User is asking for all courses, so return all without filtering
-        courses = get_courses_data()  # Fetch data from MongoDB
+        courses = catalog.snapshot().rows
+
+        # --- Summarize every course and write the overall summary concurrently ---
+        summary_prompt = course_list_summary_prompt("courses", [str(row['Name']) for row in courses])
+        summaries, summary_text = await asyncio.gather(
+            summarize_courses(courses),
+            llm.generate_text(summary_prompt),
+            return_exceptions=True,
+        )
+        if isinstance(summaries, Exception):
+            summaries = {}
+        if isinstance(summary_text, Exception):
+            summary_text = "Here are some top course recommendations."
 
         results = []
-        # Initialize Gemini model (done only once for reuse)
-        model = genai.GenerativeModel("gemini-2.0-flash")
-
         for row in courses:
-            try:
-                description_prompt = f"Summarize the following course description in 2 lines max:\n\n{row['Description']}"
-                benefits_prompt = f"Summarize the following course benefits in 2 lines max:\n\n{row['Benefits']}"
-                prerequisites_prompt = f"Summarize the prerequisites below briefly:\n\n{row['Prerequisites']}"
-
-                summarized_description = model.generate_content(description_prompt).text.strip()
-                summarized_benefits = model.generate_content(benefits_prompt).text.strip()
-                summarized_prerequisites = model.generate_content(prerequisites_prompt).text.strip()
-            except Exception as e:
-                summarized_description = row['Description']
-                summarized_benefits = row['Benefits']
-                summarized_prerequisites = row['Prerequisites']
-
+            # Fall back to the raw text for courses whose batch failed
+            summary = summaries.get(row['Id'], {})
             course_data = {
+                "id": row.id,
                 "name": str(row['Name']),
-                "description": summarized_description,
+                "description": summary.get("description") or row['Description'],
                 "price": format_price(row['Price']),
                 "level": str(row['Level']),
-                "benefits": summarized_benefits,
-                "prerequisites": summarized_prerequisites
+                "benefits": summary.get("benefits") or row['Benefits'],
+                "prerequisites": summary.get("prerequisites") or row['Prerequisites']
             }
             results.append(course_data)
 
-        # --- Add a brief summary of the matched courses using Gemini ---
-        try:
-            course_list_text = "\n\n".join([f"{c['name']}" for c in results])
-            summary_prompt = (
-                f"Write a 1-2 line summary for someone interested in 'courses', "
-                f"based on the following course benefits:\n\n{course_list_text}.\n\n"
-            )
-            summary_text = model.generate_content(summary_prompt).text.strip()
-        except Exception:
-            summary_text = "Here are some top course recommendations."
-
         return [summary_text, *results]
 
     else:
-        # If the query contains keywords, filter the courses based on the keywords
-        courses = get_courses_data()  # Fetch data from MongoDB
-
         # Step 1: First extract keywords
         keywords = extract_keywords(query)
 
-        # Step 2: Filter courses based on Tags
-        filtered_courses = []
-        for keyword in keywords:
-            temp = [course for course in courses if keyword.lower() in course['Tags'].lower()]
-            filtered_courses.extend(temp)
-
-        filtered_courses = [dict(t) for t in {tuple(d.items()) for d in filtered_courses}]  # Remove duplicates
+        # Step 2: Hybrid retrieval (BM25 over course text fused with dense FAISS ranks)
+        if dense_ids is None:
+            query_vec = await aencode_texts([query])
+            matches = search_engine.search(keywords, query_vec, k=k, filters=filters)
+        else:
+            matches = search_engine.search(keywords, k=k, filters=filters, dense_ids=dense_ids)
 
-        if not filtered_courses:
+        if not matches:
             return {"summary": "No courses found matching your query.", "courses": []}
 
-        # Step 3: Now embed filtered courses
-        filtered_course_chunks = []
-        filtered_metadata = []
-        for row in filtered_courses:
-            chunk = f"""Course: {row['Name']}
-Description: {row['Description']}
-Tags: {row['Tags']}
-Category: {row['Category']}
-Level: {row['Level']}
-Price: {row['Price']}
-Benefits: {row['Benefits']}
-Prerequisites: {row['Prerequisites']}"""
-            filtered_course_chunks.append(chunk)
-            filtered_metadata.append(row['Name'])
-
-        if not filtered_course_chunks:
-            return {"summary": "No relevant courses found.", "courses": []}
-
-        embeddings = embedder.encode(filtered_course_chunks, convert_to_tensor=False)
-        temp_index = faiss.IndexFlatL2(embeddings[0].shape[0])
-        temp_index.add(embeddings)
-
-        query_vec = embedder.encode([query])
-        D, I = temp_index.search(query_vec, min(k, len(filtered_course_chunks)))
-
         results = []
 
-        # Initialize Gemini model (done only once for reuse)
-        model = genai.GenerativeModel("gemini-2.0-flash")
-
-        for idx in I[0]:
-            if idx >= len(filtered_courses):
-                continue
-            row = filtered_courses[idx]
-
+        for row, score in matches:
             course_data = {
+                "id": row.id,
                 "name": str(row['Name']),
-                    "price": format_price(row['Price']),
-                    "level": str(row['Level']),
-                    "thumbnail": str(row.get("Thumbnail", "")),
-
+                "price": format_price(row['Price']),
+                "level": str(row['Level']),
+                "thumbnail": str(row.get("Thumbnail", "")),
+                "score": round(float(score), 6),
             }
             results.append(course_data)
 
         try:
-            course_list_text = "\n\n".join([f"{c['name']}" for c in results])
-            summary_prompt = (
-                f"Write a 1-2 line summary for someone interested in '{' '.join(query_keywords)}', "
-                f"based on the following course benefits:\n\n{course_list_text}.\n\n"
-                f"Make sure to clearly mention '{' '.join(query_keywords)}' in the summary."
-            )
+            summary_prompt = course_list_summary_prompt(" ".join(query_keywords), [c['name'] for c in results])
 
-            summary_text = model.generate_content(summary_prompt).text.strip()
+            summary_key = cache_key("course_query_summary", llm.model_name, summary_prompt)
+            summary_text = await llm_flights.do(summary_key, llm.generate_text, summary_prompt)
         except Exception:
             summary_text = "Here are some top course recommendations based on your query."
 
@@ -342,6 +662,43 @@ Prerequisites: {row['Prerequisites']}"""
 
 
 # --- Ask Course Route ---
+def parse_price_filter(filters, name):
+    value = filters.get(name)
+    if value is None or value == "":
+        return None
+    if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+        raise HTTPException(status_code=400, detail=f"'filters.{name}' must be a number.")
+    try:
+        price = float(value)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"'filters.{name}' must be a number.")
+    if not math.isfinite(price) or price < 0:
+        raise HTTPException(status_code=400, detail=f"'filters.{name}' must be a non-negative number.")
+    return price
+
+def parse_filters(value):
+    """Optional level/category/price filters, coerced to the types the search expects; bad values are a 400."""
+    if value is None:
+        return None
+    if not isinstance(value, dict):
+        raise HTTPException(status_code=400, detail="'filters' must be an object.")
+    filters = {}
+    for name in ("level", "category"):
+        text = value.get(name)
+        if text is None:
+            continue
+        if not isinstance(text, str):
+            raise HTTPException(status_code=400, detail=f"'filters.{name}' must be a string.")
+        if text.strip():
+            filters[name] = text.strip()
+    for name in ("min_price", "max_price"):
+        price = parse_price_filter(value, name)
+        if price is not None:
+            filters[name] = price
+    if filters.get("min_price", 0) > filters.get("max_price", math.inf):
+        raise HTTPException(status_code=400, detail="'filters.min_price' is above 'filters.max_price'.")
+    return filters or None
+
 @app.post("/ask_course")
 async def ask_course(request: Request):
     # Step 1: Parse the query from the request
@@ -351,6 +708,34 @@ async def ask_course(request: Request):
     if not query:
         return {"error": "No query provided."}  # If no query is provided, return an error response
 
+    filters = parse_filters(data.get("filters"))  # Optional level/category/price filters
+
+    await registry.aget("course_index")  # Waits for the warm-up on the first requests after a cold start
+
+    flight_key = ("ask_course", query, json.dumps(filters, sort_keys=True, default=str))
+    return await request_flights.do(flight_key, course_query_response, query, filters)
+
+# The all-courses listing only changes with the catalog, so it is built once per snapshot
+_course_listing = (None, [])
+
+def course_listing(snapshot) -> list:
+    global _course_listing
+    version, listing = _course_listing
+    if version != snapshot.version:
+        listing = [
+            {
+                "id": row.id,
+                "name": str(row.name),
+                "price": format_price(row.price),
+                "level": str(row.level),
+                "thumbnail": str(row.thumbnail),
+            }
+            for row in snapshot.rows
+        ]
+        _course_listing = (snapshot.version, listing)
+    return listing
+
+async def course_query_response(query: str, filters=None, search_engine=None, dense_ids=None):
     # Step 2: Clean the query to remove unnecessary words
     simple_words = [
         "what", "which", "tell", "me", "about", "find", "show", "give", "available",
@@ -362,26 +747,14 @@ async def ask_course(request: Request):
     # Step 3: Check if query is asking for a general "course" or "courses"
     if "course" in query_tokens or "courses" in query_tokens:
         if len(query_tokens) == 1:  # If the query contains only "course" or "courses"
-            courses = get_courses_data()  # Fetch all courses from MongoDB
-
-            course_data = []
-            for row in courses:
-                # Append the summarized or original course details
-                course_data.append({
-                    "name": str(row['Name']),
-                    "price": format_price(row['Price']),
-                    "level": str(row['Level']),
-                    "thumbnail": str(row.get("Thumbnail", "")),
-                })
-
             return {
                 "summary": "Here are all the available courses on our portal.",
-                "courses": course_data
+                "courses": course_listing(catalog.snapshot())  # Cached catalog, refreshed from MongoDB change events
             }
         
         else:
             # If the query contains a keyword, filter the courses
-            raw = answer_from_db(query)  # Call the function to get courses based on the query
+            raw = await answer_from_db(query, filters=filters, search_engine=search_engine, dense_ids=dense_ids)  # Call the function to get courses based on the query
             
             if isinstance(raw, dict):  # Error checking, if no courses were found
                 return raw
@@ -392,13 +765,13 @@ async def ask_course(request: Request):
             summary = raw[0]  # First element is the summary
             courses = raw[1:]  # Remaining elements are the filtered courses
 
-            # Process and return filtered courses
+            # Process and return filtered courses, once per course id
             seen = set()
-            unique_courses = [] 
+            unique_courses = []
 
             for course in courses:
-                if course["name"] not in seen:
-                    seen.add(course["name"])
+                if course["id"] not in seen:
+                    seen.add(course["id"])
                     unique_courses.append(course)
 
             return {
@@ -406,42 +779,131 @@ async def ask_course(request: Request):
                 "courses": unique_courses  # Only include unique courses in the response
             }
 
-def get_memory_usage():
-    process = os.popen(f'tasklist /FI "PID eq {os.getpid()}"').read()
-    return process
 
-# print(f"Memory Usage: {get_memory_usage()}")
+# --- Batch Routes ---
+BATCH_MAX_QUERIES = int(os.getenv("BATCH_MAX_QUERIES", "100"))
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "8"))
 
+def parse_batch_queries(data) -> list:
+    queries = data.get("queries")
+    if not isinstance(queries, list) or not queries:
+        raise HTTPException(status_code=400, detail="Provide a non-empty 'queries' list.")
+    if len(queries) > BATCH_MAX_QUERIES:
+        raise HTTPException(status_code=400, detail=f"At most {BATCH_MAX_QUERIES} queries per batch.")
+    return [str(q or "").strip().lower() for q in queries]
 
-# Load spaCy English model
-nlp = spacy.load("en_core_web_sm")
+async def run_bounded(items, func, limit=BATCH_CONCURRENCY) -> list:
+    """Run ``func`` over items concurrently, at most ``limit`` at a time, keeping order."""
+    semaphore = asyncio.Semaphore(limit)
 
-# Extract occupation from query
-def extract_occupation(query: str) -> str:
-    doc = nlp(query)
-    target_phrases = []
+    async def run(item):
+        async with semaphore:
+            return await func(item)
 
-    # Check noun chunks for likely occupations
-    for chunk in doc.noun_chunks:
-        chunk_text = chunk.text.strip().lower()
-        if "roadmap" in chunk_text:
-            continue
-        if any(keyword in chunk_text for keyword in ["developer", "engineer", "scientist", "designer", "manager", "specialist", "analyst", "architect"]):
-            target_phrases.append(chunk.text.strip())
+    return await asyncio.gather(*(run(item) for item in items))
 
-    if target_phrases:
-        occupation = target_phrases[0]
-    else:
-        # Fallback to longest noun chunk excluding 'roadmap'
-        noun_chunks = [chunk.text.strip() for chunk in doc.noun_chunks if "roadmap" not in chunk.text.lower()]
-        occupation = noun_chunks[0] if noun_chunks else "professional"
+@app.post("/ask_course/batch")
+async def ask_course_batch(request: Request):
+    data = await request.json()
+    queries = parse_batch_queries(data)
+    filters = parse_filters(data.get("filters"))
+
+    await registry.aget("course_index")
+
+    # Identical queries are answered once; all distinct ones share one encode and one FAISS search
+    unique_queries = list(dict.fromkeys(q for q in queries if q))
+    with course_index_lock:
+        search_engine = course_search
+    dense_ids = None
+    if unique_queries:
+        vectors = await aencode_texts(unique_queries)
+        dense_ids = search_engine.dense_search(vectors)
+
+    async def answer(i):
+        query = unique_queries[i]
+        try:
+            return await course_query_response(
+                query, filters, search_engine=search_engine, dense_ids=dense_ids[i] if dense_ids is not None else None
+            )
+        except Exception as e:
+            return {"error": f"Failed to answer query. {str(e)}"}
+
+    answers = dict(zip(unique_queries, await run_bounded(range(len(unique_queries)), answer)))
+    return {
+        "results": [answers[q] if q else {"error": "No query provided."} for q in queries]
+    }
+
+# --- Ask Lecture Route ---
+LECTURE_MAX_K = 20
+
+def parse_lecture_k(value) -> int:
+    """Number of lectures to return, clamped to 1..LECTURE_MAX_K; anything but an integer is a 400."""
+    if isinstance(value, bool) or not isinstance(value, (int, str)):
+        raise HTTPException(status_code=400, detail="'k' must be an integer.")
+    try:
+        k = int(value)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="'k' must be an integer.")
+    return max(1, min(k, LECTURE_MAX_K))
+
+@app.post("/ask_lecture")
+async def ask_lecture(request: Request):
+    data = await request.json()
+    query = data.get("query", "").strip().lower()
+
+    if not query:
+        return {"error": "No query provided."}
+
+    k = parse_lecture_k(data.get("k", 5))
+    matches = await search_lectures(query, k)
+
+    if not matches:
+        return {"query": query, "lectures": []}
+
+    return {
+        "query": query,
+        "lectures": [
+            {
+                "course": lecture["course_name"],
+                "course_id": lecture["course_id"],
+                "lecture": lecture["title"],
+                "section": lecture["section"],
+                "length": lecture["length"],
+                "video_url": lecture["video_url"],
+                "links": lecture["links"],
+                "score": round(score, 6),
+            }
+            for lecture, score in matches
+        ]
+    }
+
+def get_memory_usage():
+    return f"{rss_bytes() / 2 ** 20:.1f} MB"
+
+# print(f"Memory Usage: {get_memory_usage()}")
 
-    # Remove leading articles like "a", "an", "the"
-    occupation = re.sub(r"^(a|an|the)\s+", "", occupation, flags=re.IGNORECASE)
-    return occupation
+
+# Load spaCy English model (noun chunks only need the tagger and parser)
+registry.register("nlp", (lambda: retrieval_client.nlp) if retrieval_client else load_spacy_pipeline)
+
+# Rule-based occupation matcher with a cached spaCy fallback
+occupation_extractor = OccupationExtractor(lambda: registry.get("nlp"))
+
+# Extract occupation from query, as a canonical key such as "frontend developer"
+def extract_occupation(query: str) -> str:
+    return occupation_extractor.extract(query)
 
 
 # --- Get Roadmap Route ---
+ROADMAP_INSTRUCTION = (
+    "Organize the roadmap into three main phases: Phase 1 - Foundational Knowledge, Phase 2 - Building Projects, and Phase 3 - Advanced Concepts & Specialization. "
+    "Each phase should include numbered steps, important skills, tools, projects, certifications, and estimated timeframes. "
+    "Use clear formatting with section headers like 'Phase 1: Foundational Knowledge (2-4 months)' and numbered steps underneath. "
+    "Use bullet points '•' (instead of * or -) for points. "
+    "Use bullet points inside steps where helpful. End with a 'Tools & Resources:' section listing recommended platforms (starting with the LearnNexus portal), documentation, and editors. in points using bullets '•'. "
+    "Do not use any Markdown formatting or symbols. Only return the roadmap content."
+)
+
 @app.post("/get_roadmap")
 async def get_roadmap(request: Request):
     data = await request.json()
@@ -450,39 +912,110 @@ async def get_roadmap(request: Request):
     if not query:
         return {"error": "No query provided."}
 
-    # Extract key occupation keyword
-    important_keywords = extract_occupation(query)
+    await registry.aget("embedder")
+
+    # Extract key occupation keyword; spaCy only runs (off the event loop) when neither the cache nor the rules answer
+    important_keywords = occupation_extractor.lookup(query)
+    if important_keywords is None:
+        important_keywords = await asyncio.to_thread(occupation_extractor.fallback, query)
     print("Extracted:", important_keywords)
 
     topic = important_keywords if important_keywords else "this career"
 
-    roadmap_prompt = (
+    roadmap_prompt = Prompt(
+        "get_roadmap",
+        ROADMAP_INSTRUCTION,
         f"Create a complete, detailed, and structured step-by-step learning roadmap to become a {topic}. "
-        f"Begin with a one-sentence introduction like 'This roadmap outlines the steps to becoming a proficient {topic}. Timeframes are estimates and depend on prior experience and learning pace.' "
-        f"Organize it into three main phases: Phase 1 - Foundational Knowledge, Phase 2 - Building Projects, and Phase 3 - Advanced Concepts & Specialization. "
-        f"Each phase should include numbered steps, important skills, tools, projects, certifications, and estimated timeframes. "
-        f"Use clear formatting with section headers like 'Phase 1: Foundational Knowledge (2-4 months)' and numbered steps underneath. "
-        f"Use bullet points '•' (instead of * or -) for points"
-        f"Use bullet points inside steps where helpful. End with a 'Tools & Resources:' section listing recommended platforms (starting with the LearnNexus portal), documentation, and editors. in points using bullets '•'. "
-        f"Do not use any Markdown formatting or symbols. Only return the roadmap content."
+        f"Begin with a one-sentence introduction like 'This roadmap outlines the steps to becoming a proficient {topic}. Timeframes are estimates and depend on prior experience and learning pace.'",
     )
 
 
-    try:
-        model = genai.GenerativeModel("gemini-2.0-flash")
-        response = model.generate_content(roadmap_prompt)
-        roadmap_text = response.text.strip()
+    roadmap_title = f"Roadmap to Become a {topic.title()}"
 
+    def roadmap_payload(roadmap_text):
         return {
-            "roadmap_title": f"Roadmap to Become a {topic.title()}",
+            "roadmap_title": roadmap_title,
             "roadmap": roadmap_text
         }
 
+    try:
+        stream_format = get_stream_format(request, data)
+        if not stream_format:
+            # Concurrent requests for the same topic share one embedding, lookup and Gemini call
+            roadmap_text = await request_flights.do(("get_roadmap", topic), resolve_roadmap, topic, roadmap_prompt)
+            return roadmap_payload(roadmap_text)
+
+        # Roadmaps depend only on the topic, so near-identical topics share one answer
+        topic_vector = await semantic_cache.aembed(topic)
+        roadmap_text = semantic_cache.lookup("get_roadmap", topic_vector)
+        if roadmap_text is None:
+            roadmap_text = await response_cache.aget(cache_key("get_roadmap", llm.model_name, roadmap_prompt))
+        if roadmap_text is not None:
+            return stream_llm_response(stream_format, cached_text_chunks(roadmap_text), roadmap_payload)
+
+        finish = {}
+
+        async def remember_roadmap(text):
+            if finish.get("truncated"):
+                return
+            await response_cache.aset(cache_key("get_roadmap", llm.model_name, roadmap_prompt), text)
+            semantic_cache.store("get_roadmap", topic_vector, text)
+
+        chunks = llm.stream_text(roadmap_prompt, on_finish=finish.update)
+        return stream_llm_response(stream_format, chunks, roadmap_payload, remember_roadmap)
+
     except Exception as e:
         return {"error": f"Failed to generate roadmap. {str(e)}"}
 
 
+async def resolve_roadmap(topic: str, roadmap_prompt: str) -> str:
+    """Answer from the semantic cache, then the exact cache, then Gemini."""
+    topic_vector = await semantic_cache.aembed(topic)
+    roadmap_text = semantic_cache.lookup("get_roadmap", topic_vector)
+    if roadmap_text is None:
+        roadmap_text = await cached_generate_text("get_roadmap", roadmap_prompt)
+        if not is_truncated(roadmap_text):
+            semantic_cache.store("get_roadmap", topic_vector, roadmap_text)
+    return roadmap_text
+
+
 # --- Generate answers to general questions ---
+GENERAL_QUESTION_INSTRUCTION = (
+    "Provide a clear, structured answer to the user's question.\n\n"
+    "Use this consistent structure regardless of question type:\n"
+    "1. Core Explanation or Definition\n"
+    "   • Provide a simple and clear explanation or definition\n"
+    "   • If the question is about differences, start with a brief context\n"
+    "2. Key Details or Breakdown\n"
+    "   • List essential points, steps, or comparisons as bullet points\n"
+    "   • Use '•' as bullet symbol, not *, -, or markdown\n"
+    "3. Examples or Applications\n"
+    "   • Give real-world use-cases, analogies, or brief examples (if applicable) \n"
+    "4. Quick Summary\n"
+    "   • Wrap up in 1–2 sentences with a neutral conclusion\n"
+    "Formatting Rules:\n"
+    "• Use plain and simple language — avoid jargon unless necessary\n"
+    "• Do NOT include the original question in the answer\n"
+    "• Do NOT use markdown symbols (*, _, #, etc.)\n"
+    "• Avoid unnecessary repetition\n"
+    "• Maintain a neutral, informative tone"
+)
+
+def general_question_prompt(user_query: str) -> Prompt:
+    return Prompt("ask_general", GENERAL_QUESTION_INSTRUCTION, f"Question: '{cap_user_input(user_query)}'")
+
+async def answer_general_question(user_query: str, query_vector) -> str:
+    """Answer from the semantic cache, then the exact cache, then Gemini."""
+    answer = semantic_cache.lookup("ask_general", query_vector)
+    if answer is None:
+        answer = await cached_generate_text("ask_general", general_question_prompt(user_query))
+        if not is_truncated(answer):
+            semantic_cache.store("ask_general", query_vector, answer)
+    return answer
+
+async def resolve_general_answer(user_query: str) -> str:
+    return await answer_general_question(user_query, await semantic_cache.aembed(user_query))
+
 @app.post("/ask_general")
 async def ask_general_question(request: Request):
     data = await request.json()
@@ -491,37 +1024,69 @@ async def ask_general_question(request: Request):
     if not user_query:
         raise HTTPException(status_code=400, detail="No query provided.")
 
-    prompt = (
-        f"Provide a clear, structured answer to the following question:\n\n"
-        f"'{user_query}'\n\n"
-        f"Use this consistent structure regardless of question type:\n"
-        f"1. Core Explanation or Definition\n"
-        f"   • Provide a simple and clear explanation or definition\n"
-        f"   • If the question is about differences, start with a brief context\n"
-        f"2. Key Details or Breakdown\n"
-        f"   • List essential points, steps, or comparisons as bullet points\n"
-        f"   • Use '•' as bullet symbol, not *, -, or markdown\n"
-        f"3. Examples or Applications\n"
-        f"   • Give real-world use-cases, analogies, or brief examples (if applicable) \n"
-        f"4. Quick Summary\n"
-        f"   • Wrap up in 1–2 sentences with a neutral conclusion\n"
-        f"Formatting Rules:\n"
-        f"• Use plain and simple language — avoid jargon unless necessary\n"
-        f"• Do NOT include the original question in the answer\n"
-        f"• Do NOT use markdown symbols (*, _, #, etc.)\n"
-        f"• Avoid unnecessary repetition\n"
-        f"• Maintain a neutral, informative tone"
-    )
+    await registry.aget("embedder")
 
-    try:
-        model = genai.GenerativeModel("gemini-2.0-flash")
-        response = model.generate_content(prompt)
-        answer = response.text.strip()
+    prompt = general_question_prompt(user_query)
 
+    def answer_payload(answer):
         return {
             "question": user_query,
             "answer": answer
         }
 
+    try:
+        stream_format = get_stream_format(request, data)
+        if not stream_format:
+            # Concurrent identical questions share one embedding, lookup and Gemini call
+            answer = await request_flights.do(("ask_general", user_query), resolve_general_answer, user_query)
+            return answer_payload(answer)
+
+        query_vector = await semantic_cache.aembed(user_query)
+        answer = semantic_cache.lookup("ask_general", query_vector)
+        if answer is None:
+            answer = await response_cache.aget(cache_key("ask_general", llm.model_name, prompt))
+        if answer is not None:
+            return stream_llm_response(stream_format, cached_text_chunks(answer), answer_payload)
+
+        finish = {}
+
+        async def remember_answer(text):
+            if finish.get("truncated"):
+                return
+            await response_cache.aset(cache_key("ask_general", llm.model_name, prompt), text)
+            semantic_cache.store("ask_general", query_vector, text)
+
+        chunks = llm.stream_text(prompt, on_finish=finish.update)
+        return stream_llm_response(stream_format, chunks, answer_payload, remember_answer)
+
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to generate answer. {str(e)}")
+
+
+
+@app.post("/ask_general/batch")
+async def ask_general_batch(request: Request):
+    data = await request.json()
+    queries = parse_batch_queries(data)
+
+    await registry.aget("embedder")
+
+    # Identical questions are answered once; all distinct ones are embedded in one batch
+    unique_queries = list(dict.fromkeys(q for q in queries if q))
+    vectors = await semantic_cache.aembed_batch(unique_queries) if unique_queries else None
+
+    async def answer(i):
+        user_query = unique_queries[i]
+        try:
+            return {"question": user_query, "answer": await answer_general_question(user_query, vectors[i:i + 1])}
+        except Exception as e:
+            return {"question": user_query, "error": f"Failed to generate answer. {str(e)}"}
+
+    answers = dict(zip(unique_queries, await run_bounded(range(len(unique_queries)), answer)))
+    return {
+        "results": [answers[q] if q else {"error": "No query provided."} for q in queries]
+    }
+
+
+if PRELOAD_MODELS:
+    registry.warm_up(["embedder", "nlp"])
@@ -0,0 +1,135 @@
+"""Micro-benchmarks for the app's hot paths, run offline against stand-ins.
+
+Times ``extract_keywords``, ``extract_occupation`` (rule-based path, spaCy fallback and
+cached), ``load_courses_data`` and ``answer_from_db`` with a fake Gemini server and a
+mongomock catalog, and writes the results as JSON for regression comparison.
+
+    python benchmarks/bench_app.py --courses 500 --repeat 50 --json results/micro.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import shutil
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from offline import add_offline_arguments, backends_from_args  # noqa: E402
+
+COURSE_QUERIES = [
+    "python courses for beginners", "what machine learning courses do you have", "docker and kubernetes",
+    "free web development courses", "advanced react projects", "sql database course",
+]
+ROADMAP_QUERIES = [
+    "roadmap to become a web developer", "how do i become a data scientist", "roadmap for a full stack engineer",
+    "i want to be a cloud architect", "path to becoming an android developer",
+]
+# Phrasings the rule-based matcher does not cover, to exercise the spaCy fallback
+FALLBACK_QUERIES = ["roadmap for someone who loves pottery", "roadmap for quantum computing research"]
+
+
+def summarize(name, samples, **extra):
+    samples = np.asarray(samples)
+    return {
+        "name": name,
+        "runs": len(samples),
+        "mean_ms": round(float(samples.mean()) * 1000, 4),
+        "p50_ms": round(float(np.percentile(samples, 50)) * 1000, 4),
+        "p95_ms": round(float(np.percentile(samples, 95)) * 1000, 4),
+        "p99_ms": round(float(np.percentile(samples, 99)) * 1000, 4),
+        **extra,
+    }
+
+
+def time_calls(fn, inputs, repeat):
+    samples = []
+    for _ in range(repeat):
+        for value in inputs:
+            started = time.perf_counter()
+            fn(value)
+            samples.append(time.perf_counter() - started)
+    return samples
+
+
+async def time_async_calls(fn, inputs, repeat):
+    samples = []
+    for _ in range(repeat):
+        for value in inputs:
+            started = time.perf_counter()
+            await fn(value)
+            samples.append(time.perf_counter() - started)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_offline_arguments(parser)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--load-repeat", type=int, default=3, help="Runs of load_courses_data")
+    parser.add_argument("--json", help="Also write the results to this file")
+    args = parser.parse_args()
+
+    server = backends_from_args(args)
+
+    import app
+    import index_snapshot
+
+    # Models load up front so their one-off cost is not charged to the first timed call
+    app.registry.get("embedder")
+    app.registry.get("nlp")
+
+    results = []
+    results.append(summarize("extract_keywords", time_calls(app.extract_keywords, COURSE_QUERIES, args.repeat * 10)))
+
+    extractor = app.occupation_extractor
+    results.append(summarize("extract_occupation[matcher]", time_calls(extractor._extract, ROADMAP_QUERIES, args.repeat)))
+    results.append(summarize("extract_occupation[spacy]", time_calls(extractor._extract, FALLBACK_QUERIES, args.repeat)))
+    results.append(summarize("extract_occupation[cached]", time_calls(app.extract_occupation, ROADMAP_QUERIES, args.repeat * 10)))
+
+    # Cold runs re-read and re-embed the catalog; the last run maps the snapshot the previous one wrote
+    load_samples = []
+    for _ in range(args.load_repeat):
+        shutil.rmtree(index_snapshot.INDEX_SNAPSHOT_DIR, ignore_errors=True)
+        started = time.perf_counter()
+        app.load_courses_data()
+        load_samples.append(time.perf_counter() - started)
+    results.append(summarize("load_courses_data[cold]", load_samples, courses=len(app.course_ids)))
+    started = time.perf_counter()
+    app.load_courses_data()
+    results.append(summarize("load_courses_data[snapshot]", [time.perf_counter() - started], courses=len(app.course_ids)))
+
+    async def answer_benchmarks():
+        # One event loop for all async runs: the shared LLM client's semaphore is bound to it
+        samples = (
+            await time_async_calls(app.answer_from_db, COURSE_QUERIES, args.repeat),
+            await time_async_calls(app.answer_from_db, ["show me all courses"], max(1, args.repeat // 10)),
+        )
+        # Guard against timing the "no courses found" early return instead of the summary fan-out
+        listing = await app.answer_from_db("show me all courses")
+        if not isinstance(listing, list) or len(listing) < 2:
+            raise SystemExit(f"answer_from_db[all courses] did not summarize the catalog: {listing!r}")
+        return samples
+
+    search_samples, all_courses_samples = asyncio.run(answer_benchmarks())
+    gemini_latency = {"gemini_latency_s": args.gemini_latency}
+    results.append(summarize("answer_from_db", search_samples, **gemini_latency))
+    results.append(summarize("answer_from_db[all courses]", all_courses_samples, **gemini_latency))
+
+    for result in results:
+        print(json.dumps(result))
+
+    if args.json:
+        os.makedirs(os.path.dirname(os.path.abspath(args.json)), exist_ok=True)
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"config": vars(args), "python": platform.python_version(), "results": results}, f, indent=2)
+
+    server.should_exit = True
+
+
+if __name__ == "__main__":
+    main()
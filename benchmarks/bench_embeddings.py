@@ -0,0 +1,146 @@
+"""Compare embedding backends: accuracy against the fp32 reference, throughput and memory.
+
+Each backend runs in its own process so its RSS (including what its imports pull in)
+is measured in isolation. Cosine similarity between every backend's vectors and the
+``torch`` reference is checked against ``--min-cosine``; the script exits non-zero
+when a backend falls below it, so it can gate an export or dependency upgrade.
+
+    python embedding_backend.py export
+    python benchmarks/bench_embeddings.py --texts 2000 --threads 2 --json results/embeddings.json
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+
+def corpus(n, seed=0):
+    """Course chunks (long) and short queries, as the app embeds them."""
+    from synthetic_catalog import synthetic_courses
+
+    from course_db_data import flatten_course
+
+    rows = [flatten_course(doc) for doc in synthetic_courses(max(1, n // 2), lectures=4, seed=seed)]
+    texts = [
+        f"Course: {row['Name']}\nDescription: {row['Description']}\nTags: {row['Tags']}\nCategory: {row['Category']}"
+        for row in rows
+    ]
+    queries = ["python courses", "how do i become a data scientist", "docker for beginners", "what is a closure", "react projects"]
+    texts += [queries[i % len(queries)] + f" {i}" for i in range(n - len(texts))]
+    return texts[:n]
+
+
+def rss_mb():
+    from metrics import rss_bytes
+    return round(rss_bytes() / 2 ** 20, 1)
+
+
+def worker(args):
+    """Runs in a child process: load one backend, embed the corpus, report timings and RSS."""
+    texts = corpus(args.texts, args.seed)
+    baseline_rss = rss_mb()
+
+    from embedding_backend import create_embedding_backend
+
+    started = time.perf_counter()
+    backend = create_embedding_backend(args.worker, batch_size=args.batch_size, threads=args.threads)
+    load_seconds = time.perf_counter() - started
+    loaded_rss = rss_mb()
+
+    backend.encode(texts[:args.batch_size])  # warm-up
+    started = time.perf_counter()
+    vectors = backend.encode(texts)
+    batch_seconds = time.perf_counter() - started
+
+    latencies = []
+    for text in texts[:args.queries]:
+        started = time.perf_counter()
+        backend.encode([text])
+        latencies.append(time.perf_counter() - started)
+
+    np.save(args.vectors_out, vectors)
+    print(json.dumps({
+        "backend": args.worker,
+        "load_seconds": round(load_seconds, 3),
+        "texts_per_second": round(len(texts) / batch_seconds, 1),
+        "query_p50_ms": round(float(np.percentile(latencies, 50)) * 1000, 3),
+        "query_p95_ms": round(float(np.percentile(latencies, 95)) * 1000, 3),
+        "rss_before_mb": baseline_rss,
+        "rss_loaded_mb": loaded_rss,
+        "rss_peak_mb": rss_mb(),
+    }))
+
+
+def cosine_rows(a, b):
+    a = a / np.clip(np.linalg.norm(a, axis=1, keepdims=True), 1e-12, None)
+    b = b / np.clip(np.linalg.norm(b, axis=1, keepdims=True), 1e-12, None)
+    return (a * b).sum(axis=1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", default="torch,onnx,onnx-int8", help="The first one is the reference")
+    parser.add_argument("--texts", type=int, default=1000)
+    parser.add_argument("--queries", type=int, default=200, help="Single-text encodes timed for latency")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--threads", type=int, default=0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--min-cosine", type=float, default=0.98, help="Minimum per-text cosine similarity to the reference")
+    parser.add_argument("--json", help="Also write the results to this file")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    parser.add_argument("--vectors-out", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        worker(args)
+        return
+
+    backends = args.backends.split(",")
+    results = []
+    vectors = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for kind in backends:
+            out = os.path.join(tmp, f"{kind}.npy")
+            command = [
+                sys.executable, os.path.abspath(__file__), "--worker", kind, "--vectors-out", out,
+                "--texts", str(args.texts), "--queries", str(args.queries), "--batch-size", str(args.batch_size),
+                "--threads", str(args.threads), "--seed", str(args.seed),
+            ]
+            completed = subprocess.run(command, capture_output=True, text=True, cwd=ROOT)
+            if completed.returncode != 0:
+                print(f"{kind}: failed\n{completed.stderr}", file=sys.stderr)
+                continue
+            results.append(json.loads(completed.stdout.strip().splitlines()[-1]))
+            vectors[kind] = np.load(out)
+
+    passed = True
+    reference = backends[0]
+    for result in results:
+        if result["backend"] != reference and reference in vectors:
+            similarity = cosine_rows(vectors[reference], vectors[result["backend"]])
+            result["cosine_min"] = round(float(similarity.min()), 5)
+            result["cosine_mean"] = round(float(similarity.mean()), 5)
+            result["passed"] = bool(similarity.min() >= args.min_cosine)
+            passed = passed and result["passed"]
+        print(json.dumps(result))
+
+    if args.json:
+        os.makedirs(os.path.dirname(os.path.abspath(args.json)), exist_ok=True)
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"config": vars(args), "reference": reference, "results": results}, f, indent=2)
+
+    if len(results) < len(backends) or not passed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
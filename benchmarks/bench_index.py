@@ -0,0 +1,101 @@
+"""Compare FAISS index types on a synthetic catalog.
+
+Reports build time, serialized index size, single-query latency percentiles and
+recall@k against an exact (flat) index with the same metric. Index parameters are
+read from the same environment variables the app uses (HNSW_M, IVF_NLIST, PQ_M, ...).
+
+    python benchmarks/bench_index.py --vectors 200000 --queries 1000 --k 10
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import faiss  # noqa: E402
+
+from index_factory import build_index, index_variant, prepare_vectors  # noqa: E402
+
+
+def synthetic_vectors(n, dim, clusters, seed, queries=0):
+    """Clustered Gaussian vectors, closer to real sentence embeddings than uniform noise.
+
+    With ``queries`` also returns that many query vectors drawn around the same
+    cluster centers (but not copies of data points), as ``(data, queries)``.
+    """
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim)).astype("float32")
+
+    def sample(count):
+        labels = rng.integers(0, clusters, size=count)
+        return (centers[labels] + 0.35 * rng.normal(size=(count, dim))).astype("float32")
+
+    data = sample(n)
+    return (data, sample(queries)) if queries else data
+
+
+def percentile_ms(samples, q):
+    return round(float(np.percentile(samples, q)) * 1000, 4)
+
+
+def bench(kind, metric, data, queries, k, ground_truth):
+    started = time.perf_counter()
+    index = build_index(data, kind=kind, metric=metric)
+    build_seconds = time.perf_counter() - started
+
+    prepared = prepare_vectors(queries, metric)
+    latencies = []
+    found = np.empty((len(prepared), k), dtype="int64")
+    for i in range(len(prepared)):
+        started = time.perf_counter()
+        _, ids = index.search(prepared[i:i + 1], k)
+        latencies.append(time.perf_counter() - started)
+        found[i] = ids[0]
+
+    recall = np.mean([len(set(found[i]) & set(ground_truth[i])) / k for i in range(len(found))])
+    return {
+        "index": index_variant(kind, metric),
+        "build_seconds": round(build_seconds, 3),
+        "size_mb": round(faiss.serialize_index(index).nbytes / 2 ** 20, 2),
+        "p50_ms": percentile_ms(latencies, 50),
+        "p95_ms": percentile_ms(latencies, 95),
+        "p99_ms": percentile_ms(latencies, 99),
+        f"recall@{k}": round(float(recall), 4),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vectors", type=int, default=100000)
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--dim", type=int, default=384, help="384 matches paraphrase-MiniLM-L6-v2")
+    parser.add_argument("--clusters", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--types", default="flat,hnsw,ivfpq")
+    parser.add_argument("--metrics", default="l2,cosine")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="Also write the results to this file")
+    args = parser.parse_args()
+
+    data, queries = synthetic_vectors(args.vectors, args.dim, args.clusters, args.seed, queries=args.queries)
+
+    results = []
+    for metric in args.metrics.split(","):
+        baseline = build_index(data, kind="flat", metric=metric)
+        _, ground_truth = baseline.search(prepare_vectors(queries, metric), args.k)
+        for kind in args.types.split(","):
+            result = bench(kind, metric, data, queries, args.k, ground_truth)
+            results.append(result)
+            print(json.dumps(result))
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"config": vars(args), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""Check that index snapshots are shared between workers instead of copied into each one.
+
+Writes a snapshot per index type, then starts ``--workers`` processes that each load it
+(mapped, as the app does, or copied with ``--copy``) and run searches over it. Plain RSS
+counts shared file pages in every process, so each worker reports its private memory and
+PSS from /proc/self/smaps_rollup (Linux only); the mapped load should keep private memory
+near the interpreter baseline while the copied load grows with the index.
+
+    python benchmarks/bench_snapshot.py --vectors 200000 --workers 4
+    python benchmarks/bench_snapshot.py --vectors 200000 --workers 4 --copy
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+
+def memory_mb():
+    """Private and proportional set size of this process, in MB."""
+    fields = {}
+    with open("/proc/self/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 2 and parts[1].isdigit():
+                fields[parts[0].rstrip(":")] = int(parts[1])
+    private = fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0)
+    return {"private_mb": round(private / 1024, 1), "pss_mb": round(fields.get("Pss", 0) / 1024, 1)}
+
+
+def worker(args):
+    """Runs in a child process: load one snapshot, search it, report memory."""
+    import faiss
+
+    from index_snapshot import load_snapshot
+
+    ids = [str(i) for i in range(args.vectors)]
+    before = memory_mb()
+    if args.copy:
+        path = os.path.join(args.directory, args.worker)
+        index = faiss.read_index(os.path.join(path, "index.faiss"))
+    else:
+        _, index = load_snapshot(args.worker, ids, directory=args.directory)
+    queries = np.random.default_rng(1).normal(size=(args.queries, args.dim)).astype("float32")
+    index.search(queries, 10)
+    after = memory_mb()
+    print(json.dumps({"before": before, "after": after}), flush=True)
+    sys.stdin.read()  # Keep the index alive until the parent has heard from every worker
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vectors", type=int, default=100000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--types", default="flat,hnsw,ivfpq")
+    parser.add_argument("--copy", action="store_true", help="Read the index onto each worker's heap, for comparison")
+    parser.add_argument("--json", help="Also write the results to this file")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    parser.add_argument("--directory", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        worker(args)
+        return
+
+    from bench_index import synthetic_vectors
+
+    from index_factory import build_index
+    from index_snapshot import save_snapshot
+
+    vectors = synthetic_vectors(args.vectors, args.dim, 200, seed=0)
+    ids = [str(i) for i in range(args.vectors)]
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for kind in args.types.split(","):
+            save_snapshot(kind, ids, vectors, build_index(vectors, kind=kind), "synthetic", directory=directory)
+            command = [
+                sys.executable, os.path.abspath(__file__), "--worker", kind, "--directory", directory,
+                "--vectors", str(args.vectors), "--dim", str(args.dim), "--queries", str(args.queries),
+            ] + (["--copy"] if args.copy else [])
+            # All workers hold the index at the same time, as gunicorn workers would
+            processes = [
+                subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True, cwd=ROOT)
+                for _ in range(args.workers)
+            ]
+            reports = [json.loads(p.stdout.readline()) for p in processes]
+            for p in processes:
+                p.communicate()
+            result = {
+                "index": kind,
+                "mode": "copy" if args.copy else "mmap",
+                "workers": args.workers,
+                "private_growth_mb": round(float(np.mean([r["after"]["private_mb"] - r["before"]["private_mb"] for r in reports])), 1),
+                "pss_mb": round(float(np.mean([r["after"]["pss_mb"] for r in reports])), 1),
+                "index_mb": round(vectors.nbytes / 2 ** 20, 1),
+            }
+            results.append(result)
+            print(json.dumps(result))
+
+    if args.json:
+        os.makedirs(os.path.dirname(os.path.abspath(args.json)), exist_ok=True)
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"config": vars(args), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+"""Local stand-in for the Gemini REST API with configurable latency.
+
+Serves ``generateContent`` and ``streamGenerateContent`` for any model so the app can
+be benchmarked without quota or network jitter. Point the app at it with
+
+    GEMINI_TRANSPORT=rest GEMINI_API_ENDPOINT=http://127.0.0.1:8090 GEMINI_API_KEY=fake
+
+    python benchmarks/fake_gemini.py --port 8090 --latency 0.8 --jitter 0.2 --chunk-delay 0.05
+"""
+import argparse
+import asyncio
+import json
+import random
+import re
+import threading
+import time
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+FILLER = (
+    "Start with the fundamentals, then build small projects that apply each new concept. "
+    "Review what you built, read other people's code and keep a steady weekly practice schedule. "
+)
+
+
+class FakeGeminiConfig:
+    def __init__(self, latency=0.5, jitter=0.1, chunk_delay=0.05, chunks=8, words=120, error_rate=0.0, seed=None):
+        self.latency = latency  # seconds before the first byte
+        self.jitter = jitter  # +/- uniform jitter on latency
+        self.chunk_delay = chunk_delay  # seconds between streamed chunks
+        self.chunks = chunks
+        self.words = words
+        self.error_rate = error_rate  # fraction of calls answered with 503
+        self.random = random.Random(seed)
+        self.calls = 0
+        self.in_flight = 0  # requests inside their latency window, and the most seen at once
+        self.max_in_flight = 0
+
+
+def approx_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+def prompt_text(body) -> str:
+    return "\n".join(
+        part.get("text", "")
+        for content in body.get("contents", [])
+        for part in content.get("parts", [])
+    )
+
+
+def system_text(body) -> str:
+    instruction = body.get("systemInstruction") or body.get("system_instruction") or {}
+    return "\n".join(part.get("text", "") for part in instruction.get("parts", []))
+
+
+def json_mode_answer(prompt: str) -> str:
+    """Answer JSON-mode prompts by echoing one summary object per input course."""
+    start = prompt.find("[")
+    try:
+        items = json.loads(prompt[start:]) if start != -1 else []
+    except ValueError:
+        items = []
+    return json.dumps([
+        {
+            "id": item["id"],
+            "description": "A short summary of the course.",
+            "benefits": "Practical, job-ready skills.",
+            "prerequisites": "None.",
+        }
+        for item in items
+        if isinstance(item, dict) and "id" in item
+    ])
+
+
+def text_answer(config, prompt: str, max_tokens=None) -> str:
+    # Filler words run about 1.5 tokens each, so a token budget caps the word count
+    limit = min(config.words, int(max_tokens / 1.5)) if max_tokens else config.words
+    words = (FILLER * (limit // 20 + 1)).split()[:limit]
+    topic = re.findall(r"'([^']+)'", prompt)
+    return (f"About {topic[0]}: " if topic else "") + " ".join(words)
+
+
+def candidate(text, prompt_tokens, completion_tokens, finished=True, finish_reason="STOP"):
+    payload = {
+        "candidates": [{"content": {"parts": [{"text": text}], "role": "model"}, "index": 0}],
+        "usageMetadata": {
+            "promptTokenCount": prompt_tokens,
+            "candidatesTokenCount": completion_tokens,
+            "totalTokenCount": prompt_tokens + completion_tokens,
+        },
+    }
+    if finished:
+        payload["candidates"][0]["finishReason"] = finish_reason
+    return payload
+
+
+def create_app(config: FakeGeminiConfig) -> FastAPI:
+    app = FastAPI()
+
+    async def answer(body):
+        config.calls += 1
+        delay = max(0.0, config.latency + config.random.uniform(-config.jitter, config.jitter))
+        config.in_flight += 1
+        config.max_in_flight = max(config.max_in_flight, config.in_flight)
+        try:
+            await asyncio.sleep(delay)
+        finally:
+            config.in_flight -= 1
+        if config.random.random() < config.error_rate:
+            return None, None, None
+        prompt = prompt_text(body)
+        generation_config = body.get("generationConfig") or {}
+        mime_type = generation_config.get("responseMimeType") or generation_config.get("response_mime_type")
+        max_tokens = generation_config.get("maxOutputTokens") or generation_config.get("max_output_tokens")
+        finish_reason = "STOP"
+        if mime_type == "application/json":
+            text = json_mode_answer(prompt)
+        else:
+            text = text_answer(config, prompt, max_tokens)
+            # Like Gemini, report MAX_TOKENS when the budget cut the answer short
+            if max_tokens and config.words > int(max_tokens / 1.5):
+                finish_reason = "MAX_TOKENS"
+        # The system instruction is billed as prompt tokens too
+        return "\n".join(filter(None, [system_text(body), prompt])), text, finish_reason
+
+    def unavailable():
+        return JSONResponse(status_code=503, content={"error": {"code": 503, "message": "fake overload", "status": "UNAVAILABLE"}})
+
+    @app.post("/{version}/models/{method}")
+    async def generate(version: str, method: str, request: Request):
+        body = await request.json()
+        prompt, text, finish_reason = await answer(body)
+        if text is None:
+            return unavailable()
+        prompt_tokens = approx_tokens(prompt)
+
+        if method.endswith(":generateContent"):
+            return candidate(text, prompt_tokens, approx_tokens(text), finish_reason=finish_reason)
+        if not method.endswith(":streamGenerateContent"):
+            return JSONResponse(status_code=404, content={"error": {"code": 404, "message": f"Unknown method {method}"}})
+
+        words = text.split(" ")
+        size = max(1, len(words) // max(1, config.chunks))
+        pieces = [" ".join(words[i:i + size]) + " " for i in range(0, len(words), size)]
+        sse = request.query_params.get("alt") == "sse"
+
+        async def events():
+            # Default REST streaming is one JSON array sent element by element; alt=sse uses data: lines
+            if not sse:
+                yield "["
+            for i, piece in enumerate(pieces):
+                if i:
+                    await asyncio.sleep(config.chunk_delay)
+                last = i == len(pieces) - 1
+                chunk = json.dumps(candidate(piece, prompt_tokens, approx_tokens(text) if last else 0, finished=last, finish_reason=finish_reason))
+                if sse:
+                    yield f"data: {chunk}\r\n\r\n"
+                else:
+                    yield ("," if i else "") + chunk
+            if not sse:
+                yield "]"
+
+        return StreamingResponse(events(), media_type="text/event-stream" if sse else "application/json")
+
+    @app.get("/stats")
+    async def stats():
+        return {"calls": config.calls, "max_in_flight": config.max_in_flight}
+
+    return app
+
+
+def start_in_thread(host="127.0.0.1", port=8090, **options):
+    """Run the fake server on a background thread; returns the uvicorn server (call ``should_exit = True`` to stop)."""
+    server = uvicorn.Server(uvicorn.Config(create_app(FakeGeminiConfig(**options)), host=host, port=port, log_level="warning"))
+    threading.Thread(target=server.run, name="fake-gemini", daemon=True).start()
+    deadline = time.time() + 10
+    while not server.started:
+        if time.time() > deadline:
+            raise RuntimeError("Fake Gemini server did not start")
+        time.sleep(0.05)
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--latency", type=float, default=0.5, help="Seconds before the first byte")
+    parser.add_argument("--jitter", type=float, default=0.1)
+    parser.add_argument("--chunk-delay", type=float, default=0.05, help="Seconds between streamed chunks")
+    parser.add_argument("--chunks", type=int, default=8)
+    parser.add_argument("--words", type=int, default=120, help="Length of text answers")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of calls answered with 503")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    config = FakeGeminiConfig(args.latency, args.jitter, args.chunk_delay, args.chunks, args.words, args.error_rate, args.seed)
+    uvicorn.run(create_app(config), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+"""Concurrent load test for the HTTP endpoints.
+
+A closed-loop asyncio driver: ``--concurrency`` virtual users each send a request,
+wait for the full response and send the next, for ``--duration`` seconds. Reports
+throughput, error count and latency percentiles per endpoint (plus time to first byte
+with ``--stream``), and can compare against a previous run's JSON.
+
+    python benchmarks/offline.py --courses 500 &
+    python benchmarks/load_test.py --concurrency 32 --duration 60 --json results/load.json
+    python benchmarks/load_test.py --compare results/load.json --max-regression 0.15
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+
+import httpx
+import numpy as np
+
+QUERIES = {
+    # Course queries need "course"/"courses" plus a topic to reach retrieval; "courses" alone is the listing,
+    # and "all courses" summarizes the whole catalog
+    "/ask_course": [
+        "python courses", "machine learning courses for beginners", "docker kubernetes course",
+        "free web development courses", "advanced react courses", "sql database courses", "courses",
+        "show me all courses",
+    ],
+    "/ask_general": [
+        "what is a closure in javascript", "explain big o notation", "how does https work",
+        "difference between a process and a thread", "what is dependency injection",
+    ],
+    "/get_roadmap": [
+        "roadmap to become a web developer", "roadmap for a data scientist", "how do i become a devops engineer",
+        "roadmap to become an android developer",
+    ],
+    "/ask_lecture": ["docker lesson", "python lesson 3", "intro to machine learning"],
+    "/greet": ["hi", "hello there", "good morning"],
+}
+DEFAULT_MIX = "/ask_course:4,/ask_general:2,/get_roadmap:2,/ask_lecture:1,/greet:1"
+
+
+def parse_mix(mix):
+    weights = {}
+    for item in mix.split(","):
+        path, _, weight = item.partition(":")
+        if path not in QUERIES:
+            raise SystemExit(f"Unknown endpoint {path}; expected one of {sorted(QUERIES)}")
+        weights[path] = float(weight or 1)
+    return weights
+
+
+def percentiles_ms(samples):
+    if not samples:
+        return {"p50_ms": None, "p95_ms": None, "p99_ms": None}
+    return {f"p{q}_ms": round(float(np.percentile(samples, q)) * 1000, 2) for q in (50, 95, 99)}
+
+
+def response_ok(status_code, body, stream):
+    """2xx/3xx with a real answer; a null body or an {"error": ...} payload counts as a failure."""
+    if status_code >= 400:
+        return False
+    if stream:
+        return bool(body.strip())
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        return False
+    return payload is not None and not (isinstance(payload, dict) and "error" in payload)
+
+
+async def user(client, weights, stream, deadline, rng, records):
+    paths, weight_values = list(weights), list(weights.values())
+    headers = {"Accept": "text/event-stream"} if stream else {}
+    while time.perf_counter() < deadline:
+        path = rng.choices(paths, weight_values)[0]
+        body = {"query": rng.choice(QUERIES[path])}
+        started = time.perf_counter()
+        first_byte = None
+        try:
+            async with client.stream("POST", path, json=body, headers=headers) as response:
+                content = b""
+                async for chunk in response.aiter_bytes():
+                    if first_byte is None:
+                        first_byte = time.perf_counter() - started
+                    content += chunk
+                ok = response_ok(response.status_code, content, stream)
+        except httpx.HTTPError:
+            ok = False
+        records.append((path, ok, time.perf_counter() - started, first_byte))
+
+
+async def run(args):
+    weights = parse_mix(args.mix)
+    records = []
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout, limits=limits) as client:
+        if args.warmup:
+            # Waits out the background model/index warm-up so it is not measured
+            for _ in range(int(args.warmup * 10)):
+                try:
+                    if (await client.get("/readyz")).status_code == 200:
+                        break
+                except httpx.HTTPError:
+                    pass
+                await asyncio.sleep(0.1)
+
+        started = time.perf_counter()
+        deadline = started + args.duration
+        await asyncio.gather(*(
+            user(client, weights, args.stream, deadline, random.Random(args.seed + i), records)
+            for i in range(args.concurrency)
+        ))
+        elapsed = time.perf_counter() - started
+
+    endpoints = {}
+    for path in weights:
+        rows = [r for r in records if r[0] == path]
+        latencies = [r[2] for r in rows if r[1]]
+        result = {
+            "requests": len(rows),
+            "errors": sum(1 for r in rows if not r[1]),
+            "throughput_rps": round(len(rows) / elapsed, 2),
+            **percentiles_ms(latencies),
+        }
+        if args.stream:
+            result["ttfb"] = percentiles_ms([r[3] for r in rows if r[1] and r[3] is not None])
+        endpoints[path] = result
+
+    ok = [r[2] for r in records if r[1]]
+    overall = {
+        "requests": len(records),
+        "errors": len(records) - len(ok),
+        "throughput_rps": round(len(records) / elapsed, 2),
+        **percentiles_ms(ok),
+    }
+    return {"config": vars(args), "elapsed_s": round(elapsed, 2), "overall": overall, "endpoints": endpoints}
+
+
+def compare(current, baseline, max_regression):
+    """Print p95 changes per endpoint; return False if any regressed by more than ``max_regression``."""
+    passed = True
+    for path, result in current["endpoints"].items():
+        before = baseline.get("endpoints", {}).get(path, {}).get("p95_ms")
+        after = result["p95_ms"]
+        if not before or after is None:
+            continue
+        change = (after - before) / before
+        flag = ""
+        if max_regression is not None and change > max_regression:
+            flag = "  REGRESSION"
+            passed = False
+        print(f"{path:16} p95 {before:9.2f} ms -> {after:9.2f} ms ({change:+.1%}){flag}")
+    return passed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=30)
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="Weighted endpoints, e.g. /ask_course:3,/greet:1")
+    parser.add_argument("--stream", action="store_true", help="Request streamed responses and record time to first byte")
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--warmup", type=float, default=120, help="Seconds to wait for /readyz before starting (0 skips)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="Write the results to this file")
+    parser.add_argument("--compare", help="Baseline JSON from a previous run")
+    parser.add_argument("--max-regression", type=float, help="Exit non-zero if any p95 grows by more than this fraction")
+    args = parser.parse_args()
+
+    # Read the baseline first, it may be the same file as --json
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    results = asyncio.run(run(args))
+    print(json.dumps({"overall": results["overall"], "endpoints": results["endpoints"]}, indent=2))
+
+    if args.json:
+        os.makedirs(os.path.dirname(os.path.abspath(args.json)), exist_ok=True)
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+    if baseline is not None and not compare(results, baseline, args.max_regression):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
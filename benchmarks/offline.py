@@ -0,0 +1,95 @@
+"""Run the app against local stand-ins for Gemini and MongoDB.
+
+``use_offline_backends`` must run before ``app`` is imported: the app reads its Gemini
+endpoint, cache paths and snapshot directory from the environment at import time.
+
+    python benchmarks/offline.py --courses 500 --gemini-latency 0.8 --port 8000
+    python benchmarks/load_test.py --base-url http://127.0.0.1:8000
+"""
+import argparse
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import fake_gemini  # noqa: E402
+from synthetic_catalog import install_mongomock, load_fixture, synthetic_courses  # noqa: E402
+
+
+def use_offline_backends(courses=200, fixture=None, mongo_uri=None, gemini_port=8090, gemini_options=None,
+                         cache=False, snapshots=False):
+    """Point the app at a fake Gemini server and a seeded Mongo stand-in.
+
+    With ``cache=False`` the exact and semantic LLM caches are disabled so every call
+    pays the (fake) Gemini latency; with ``snapshots=False`` index snapshots go to a
+    throwaway directory so course embeddings are always recomputed.
+    """
+    workdir = tempfile.mkdtemp(prefix="nexgenie-bench-")
+    os.environ.update({
+        "GEMINI_API_KEY": "fake-key",
+        "GEMINI_TRANSPORT": "rest",
+        "GEMINI_API_ENDPOINT": f"http://127.0.0.1:{gemini_port}",
+    })
+    if not snapshots:
+        os.environ["INDEX_SNAPSHOT_DIR"] = os.path.join(workdir, "snapshots")
+    if cache:
+        os.environ.setdefault("LLM_CACHE_PATH", os.path.join(workdir, "llm_cache.sqlite3"))
+    else:
+        os.environ.update({"LLM_CACHE_PATH": "", "LLM_CACHE_MEMORY_ITEMS": "0", "SEMANTIC_CACHE_THRESHOLD": "2"})
+
+    server = fake_gemini.start_in_thread(port=gemini_port, **(gemini_options or {}))
+
+    if mongo_uri:
+        # A real local mongod already seeded with synthetic_catalog.py --mongo-uri
+        os.environ["MONGO_URI"] = mongo_uri
+        os.environ.setdefault("MONGO_DB", "nexgenie")
+        os.environ.setdefault("MONGO_COLLECTION", "courses")
+    else:
+        docs = load_fixture(fixture) if fixture else synthetic_courses(courses)
+        install_mongomock(docs)
+    return server
+
+
+def add_offline_arguments(parser):
+    parser.add_argument("--courses", type=int, default=200, help="Synthetic catalog size")
+    parser.add_argument("--fixture", help="Load the catalog from a JSON fixture instead")
+    parser.add_argument("--mongo-uri", help="Use a real (seeded) MongoDB instead of mongomock")
+    parser.add_argument("--gemini-port", type=int, default=8090)
+    parser.add_argument("--gemini-latency", type=float, default=0.5)
+    parser.add_argument("--gemini-jitter", type=float, default=0.1)
+    parser.add_argument("--gemini-chunk-delay", type=float, default=0.05)
+    parser.add_argument("--cache", action="store_true", help="Keep the LLM response and semantic caches enabled")
+
+
+def backends_from_args(args):
+    return use_offline_backends(
+        courses=args.courses,
+        fixture=args.fixture,
+        mongo_uri=args.mongo_uri,
+        gemini_port=args.gemini_port,
+        gemini_options={"latency": args.gemini_latency, "jitter": args.gemini_jitter, "chunk_delay": args.gemini_chunk_delay},
+        cache=args.cache,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_offline_arguments(parser)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args()
+
+    backends_from_args(args)
+
+    import uvicorn
+
+    from app import app
+
+    # A single in-process worker: mongomock state is not shared across processes
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""Synthetic course catalog and local MongoDB stand-ins for benchmarks.
+
+Documents have the same shape as the production ``courses`` collection (nested
+``courseData`` lessons with links), so ``course_db_data`` flattens them
+exactly as it does real data.
+
+    python benchmarks/synthetic_catalog.py --courses 500 --out catalog.json
+    python benchmarks/synthetic_catalog.py --courses 500 --mongo-uri mongodb://localhost:27017
+"""
+import argparse
+import json
+import os
+import random
+import sys
+
+from bson import ObjectId
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+TOPICS = [
+    ("Python", "Programming"), ("JavaScript", "Web Development"), ("React", "Web Development"),
+    ("Node.js", "Web Development"), ("Machine Learning", "Data Science"), ("Deep Learning", "Data Science"),
+    ("SQL", "Databases"), ("MongoDB", "Databases"), ("Docker", "DevOps"), ("Kubernetes", "DevOps"),
+    ("AWS", "Cloud"), ("Flutter", "Mobile Development"), ("Kotlin", "Mobile Development"),
+    ("UI Design", "Design"), ("Cybersecurity", "Security"), ("Data Analysis", "Data Science"),
+]
+LEVELS = ["Beginner", "Intermediate", "Advanced"]
+FORMATS = ["Complete {} Bootcamp", "{} for Beginners", "Mastering {}", "{} in Practice", "Advanced {} Projects"]
+SECTIONS = ["Introduction", "Core Concepts", "Hands-on Project", "Best Practices", "Wrap-up"]
+
+
+def synthetic_courses(n=200, lectures=12, seed=0) -> list:
+    """Deterministic Mongo-shaped course documents."""
+    rng = random.Random(seed)
+    courses = []
+    for i in range(n):
+        topic, category = rng.choice(TOPICS)
+        name = rng.choice(FORMATS).format(topic)
+        price = rng.choice([0, 0, 19, 29, 49, 79, 99])
+        courses.append({
+            "_id": ObjectId(f"{seed % 2 ** 32:08x}{i:016x}"),
+            "name": f"{name} #{i}",
+            "description": (
+                f"Learn {topic} from the ground up. This course covers the essential {topic} concepts, "
+                f"tooling and workflows used in {category.lower()} teams, with exercises after every module. "
+            ) * rng.randint(1, 4),
+            "categories": category,
+            "level": rng.choice(LEVELS),
+            "price": price,
+            "estimatedPrice": price + rng.choice([0, 20, 50]),
+            "thumbnail": {"url": f"https://example.com/thumbnails/{i}.png"},
+            "tags": rng.sample([topic.lower(), category.lower(), "projects", "career", "fundamentals", "interview"], 3),
+            "benefits": [{"title": f"Build real {topic} projects"}, {"title": "Certificate of completion"}],
+            "prerequisites": [{"title": rng.choice(["None", "Basic programming", f"Some {category.lower()} experience"])}],
+            "courseData": [
+                {
+                    "title": f"{topic} lesson {j + 1}",
+                    "videosection": SECTIONS[j * len(SECTIONS) // lectures],
+                    "description": f"In this lesson we look at {topic} step {j + 1} with a worked example.",
+                    "videolength": rng.randint(3, 25),
+                    "videourl": f"https://example.com/videos/{i}/{j}",
+                    "links": [{"title": "Slides", "url": f"https://example.com/slides/{i}/{j}"}],
+                }
+                for j in range(lectures)
+            ],
+        })
+    return courses
+
+
+def save_fixture(courses, path):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump([{**doc, "_id": str(doc["_id"])} for doc in courses], f)
+
+
+def load_fixture(path) -> list:
+    """Load a JSON export (e.g. ``mongoexport --jsonArray``) or a fixture written by ``save_fixture``."""
+    with open(path, encoding="utf-8") as f:
+        docs = json.load(f)
+    for doc in docs:
+        raw_id = doc.get("_id")
+        if isinstance(raw_id, dict) and "$oid" in raw_id:
+            raw_id = raw_id["$oid"]
+        if isinstance(raw_id, str) and ObjectId.is_valid(raw_id):
+            doc["_id"] = ObjectId(raw_id)
+    return docs
+
+
+def install_mongomock(courses):
+    """Replace the app's pooled MongoClient with an in-process mongomock seeded with ``courses``.
+
+    mongomock has no change streams, so the catalog watcher falls back to polling.
+    """
+    import mongomock
+
+    import course_db_data
+
+    client = mongomock.MongoClient()
+    course_db_data.MONGO_DB = course_db_data.MONGO_DB or "nexgenie"
+    course_db_data.MONGO_COLLECTION = course_db_data.MONGO_COLLECTION or "courses"
+    client[course_db_data.MONGO_DB][course_db_data.MONGO_COLLECTION].insert_many([dict(doc) for doc in courses])
+    with course_db_data._client_lock:
+        course_db_data._client = client
+        course_db_data._client_pid = os.getpid()
+    return client
+
+
+def seed_mongo(uri, courses, db="nexgenie", collection="courses"):
+    """Replace the contents of a (local, disposable) MongoDB collection with ``courses``."""
+    from pymongo import MongoClient
+
+    client = MongoClient(uri)
+    try:
+        target = client[db][collection]
+        target.delete_many({})
+        target.insert_many([dict(doc) for doc in courses])
+    finally:
+        client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--courses", type=int, default=200)
+    parser.add_argument("--lectures", type=int, default=12)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="Write the catalog to this JSON fixture")
+    parser.add_argument("--mongo-uri", help="Seed this MongoDB (the collection is emptied first)")
+    parser.add_argument("--db", default="nexgenie")
+    parser.add_argument("--collection", default="courses")
+    args = parser.parse_args()
+
+    courses = synthetic_courses(args.courses, args.lectures, args.seed)
+    if args.out:
+        save_fixture(courses, args.out)
+    if args.mongo_uri:
+        seed_mongo(args.mongo_uri, courses, args.db, args.collection)
+    print(f"Generated {len(courses)} courses")
+
+
+if __name__ == "__main__":
+    main()
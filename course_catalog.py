@@ -0,0 +1,145 @@
+import logging
+import os
+import threading
+from types import MappingProxyType
+
+from pymongo.errors import OperationFailure, PyMongoError
+
+from course_db_data import flatten_course, get_collection, get_courses_data
+from course_record import DIGEST_COLUMN, SCALAR_COLUMNS
+
+# Seconds between full resyncs when change streams are unavailable
+# (standalone mongod, mongomock) and between reconnect attempts.
+CATALOG_POLL_INTERVAL = float(os.getenv("CATALOG_POLL_INTERVAL", "30"))
+
+# Request handlers never read lessons (the lecture index streams them separately), so the
+# catalog keeps only a digest of them: enough for resync to notice lesson-only edits
+CATALOG_FIELDS = SCALAR_COLUMNS + (DIGEST_COLUMN,)
+
+
+class CatalogSnapshot:
+    """Immutable view of the course catalog handed out to request handlers."""
+
+    __slots__ = ("version", "rows", "by_id")
+
+    def __init__(self, version, rows):
+        self.version = version
+        self.rows = tuple(rows)  # CourseRecords, already immutable
+        self.by_id = MappingProxyType({row.id: row for row in self.rows})
+
+
+class CourseCatalog:
+    """In-memory copy of the courses as CourseRecords, kept fresh from MongoDB.
+
+    Listeners registered with ``subscribe`` are called as
+    ``callback(changed_rows, deleted_ids)`` from the watcher thread whenever
+    courses are inserted, updated or removed.
+    """
+
+    def __init__(self, poll_interval=CATALOG_POLL_INTERVAL):
+        self.poll_interval = poll_interval
+        self._snapshot = CatalogSnapshot(0, [])
+        self._lock = threading.Lock()
+        self._listeners = []
+        self._stop = threading.Event()
+        self._thread = None
+        self._resume_token = None
+
+    def snapshot(self) -> CatalogSnapshot:
+        return self._snapshot
+
+    def subscribe(self, callback):
+        self._listeners.append(callback)
+
+    def load(self) -> CatalogSnapshot:
+        """Replace the cached catalog with a full read, without notifying listeners."""
+        rows = get_courses_data(CATALOG_FIELDS)
+        with self._lock:
+            self._snapshot = CatalogSnapshot(self._snapshot.version + 1, rows)
+        return self._snapshot
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="course-catalog-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=5):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    # --- Applying changes ---
+    def _apply(self, changed_rows, deleted_ids):
+        if not changed_rows and not deleted_ids:
+            return
+        with self._lock:
+            rows = dict(self._snapshot.by_id)
+            for course_id in deleted_ids:
+                rows.pop(course_id, None)
+            for row in changed_rows:
+                rows[row.id] = row
+            self._snapshot = CatalogSnapshot(self._snapshot.version + 1, rows.values())
+            changed_rows = [self._snapshot.by_id[row.id] for row in changed_rows]
+
+        for callback in self._listeners:
+            try:
+                callback(changed_rows, list(deleted_ids))
+            except Exception:
+                logging.exception("Course catalog listener failed")
+
+    def resync(self):
+        """Diff a full read against the snapshot and apply only what changed."""
+        fresh = {row.id: row for row in get_courses_data(CATALOG_FIELDS)}
+        current = self._snapshot.by_id
+        changed = [row for course_id, row in fresh.items() if current.get(course_id) != row]
+        deleted = [course_id for course_id in current if course_id not in fresh]
+        self._apply(changed, deleted)
+
+    def _handle_change(self, change):
+        operation = change.get("operationType")
+        if operation in ("insert", "update", "replace"):
+            doc = change.get("fullDocument")
+            if doc is None:
+                # Document was deleted again before the lookup ran
+                self._apply([], [str(change["documentKey"]["_id"])])
+            else:
+                self._apply([flatten_course(doc, CATALOG_FIELDS)], [])
+        elif operation == "delete":
+            self._apply([], [str(change["documentKey"]["_id"])])
+        elif operation in ("drop", "rename", "dropDatabase", "invalidate"):
+            self._resume_token = None
+            self.resync()
+
+    # --- Watcher thread ---
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self._watch()
+            except (OperationFailure, NotImplementedError) as e:
+                logging.info(f"Change streams unavailable ({e}), polling the course catalog instead.")
+                self._poll()
+            except PyMongoError as e:
+                logging.warning(f"Course catalog watcher lost its connection: {e}")
+                self._stop.wait(self.poll_interval)
+
+    def _watch(self):
+        collection = get_collection()
+        with collection.watch(full_document="updateLookup", resume_after=self._resume_token, max_await_time_ms=1000) as stream:
+            if self._resume_token is None:
+                # Catch up on anything missed between the initial load and the stream opening
+                self.resync()
+            while not self._stop.is_set() and stream.alive:
+                change = stream.try_next()
+                if change is not None:
+                    self._handle_change(change)
+                self._resume_token = stream.resume_token
+
+    def _poll(self):
+        while not self._stop.wait(self.poll_interval):
+            try:
+                self.resync()
+            except PyMongoError as e:
+                logging.warning(f"Course catalog poll failed: {e}")
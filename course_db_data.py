@@ -1,39 +1,129 @@
 from pymongo import MongoClient
 import os
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from dotenv import load_dotenv
 
+from course_record import DIGEST_COLUMN, VIDEO_COLUMNS, CourseRecord
+from metrics import span
+
 load_dotenv()
 
 MONGO_URI = os.getenv("MONGO_URI")
 MONGO_DB = os.getenv("MONGO_DB")
 MONGO_COLLECTION = os.getenv("MONGO_COLLECTION")
 
-def get_courses_data():
-    """Fetch all courses from MongoDB and return a list of flattened dicts."""
-    client = MongoClient(MONGO_URI)
-    db = client[MONGO_DB]
-    collection = db[MONGO_COLLECTION]
-
-    docs = list(collection.find())
-    courses = []
-    for doc in docs:
-        d = {k.lower(): v for k, v in doc.items()}
-        row = {
-            "Name": d.get("name", ""),
-            "Description": d.get("description", ""),
-            "Category": d.get("categories", ""),
-            "Level": d.get("level", ""),
-            "Price": d.get("price", 0),
-            "Estimated Price": d.get("estimatedprice", 0),
-            "Thumbnail": d.get("thumbnail", {}).get("url", "") if isinstance(d.get("thumbnail"), dict) else "",
-            "Tags": ", ".join(d.get("tags", [])),
-            "Benefits": " | ".join(b.get("title", "") for b in d.get("benefits", [])),
-            "Prerequisites": " | ".join(p.get("title", "") for p in d.get("prerequisites", [])),
-            "Video Titles": " | ".join(v.get("title", "") for v in d.get("coursedata", [])),
-            "Video Sections": " | ".join(v.get("videosection", "") for v in d.get("coursedata", [])),
-            "Video Lengths": " | ".join(str(v.get("videolength", 0)) for v in d.get("coursedata", [])),
-            "Video Links": " | ".join(" & ".join(link.get("url", "") for link in v.get("links", [])) for v in d.get("coursedata", [])),
-        }
-        courses.append(row)
-
-    return courses
\ No newline at end of file
+# Connection pool settings, one pool per worker process
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "50"))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "0"))
+MONGO_TIMEOUT_MS = int(os.getenv("MONGO_TIMEOUT_MS", "10000"))
+# Threads used by the async API to run blocking driver calls off the event loop
+MONGO_IO_THREADS = int(os.getenv("MONGO_IO_THREADS", "8"))
+
+# Mongo fields that feed each flattened column, used to build projections.
+# Both spellings are listed because flatten_course matches keys case-insensitively.
+COURSE_FIELD_SOURCES = {
+    "Id": ("_id",),
+    "Name": ("name",),
+    "Description": ("description",),
+    "Category": ("categories",),
+    "Level": ("level",),
+    "Price": ("price",),
+    "Estimated Price": ("estimatedPrice", "estimatedprice"),
+    "Thumbnail": ("thumbnail",),
+    "Tags": ("tags",),
+    "Benefits": ("benefits",),
+    "Prerequisites": ("prerequisites",),
+    "Video Titles": ("courseData", "coursedata"),
+    "Video Sections": ("courseData", "coursedata"),
+    "Video Lengths": ("courseData", "coursedata"),
+    "Video Links": ("courseData", "coursedata"),
+    DIGEST_COLUMN: ("courseData", "coursedata"),
+}
+
+_client = None
+_client_pid = None
+_client_lock = threading.Lock()
+_executor = None
+
+def get_client():
+    """Return this process's shared, pooled MongoClient, creating it on first use."""
+    global _client, _client_pid
+    # MongoClient is not fork-safe, so a client inherited from a parent process is never reused
+    if _client is None or _client_pid != os.getpid():
+        with _client_lock:
+            if _client is None or _client_pid != os.getpid():
+                _client = MongoClient(
+                    MONGO_URI,
+                    maxPoolSize=MONGO_MAX_POOL_SIZE,
+                    minPoolSize=MONGO_MIN_POOL_SIZE,
+                    serverSelectionTimeoutMS=MONGO_TIMEOUT_MS,
+                )
+                _client_pid = os.getpid()
+    return _client
+
+def get_collection():
+    return get_client()[MONGO_DB][MONGO_COLLECTION]
+
+def close_client():
+    """Close the shared client and the async I/O threads; safe to call more than once."""
+    global _client, _client_pid, _executor
+    with _client_lock:
+        if _client is not None and _client_pid == os.getpid():
+            _client.close()
+        _client = None
+        _client_pid = None
+        if _executor is not None:
+            _executor.shutdown(wait=False)
+            _executor = None
+
+def course_projection(fields=None):
+    """Build a Mongo projection that fetches only what the given flattened columns need."""
+    if fields is None:
+        return None
+    projection = {}
+    for field in fields:
+        for source in COURSE_FIELD_SOURCES[field]:
+            projection[source] = 1
+    return projection
+
+def flatten_course(doc, fields=None):
+    """Flatten a single course document into an immutable CourseRecord.
+
+    Lesson data is only kept when ``fields`` is None or asks for a video column.
+    """
+    with_lessons = fields is None or any(field in VIDEO_COLUMNS for field in fields)
+    return CourseRecord.from_document(doc, with_lessons=with_lessons)
+
+def get_courses_data(fields=None):
+    """Fetch all courses from MongoDB as CourseRecords.
+
+    Pass ``fields`` (flattened column names) to fetch only the Mongo fields they need.
+    """
+    collection = get_collection()
+
+    with span("mongo_fetch"):
+        docs = collection.find({}, course_projection(fields))
+        courses = []
+        for doc in docs:
+            courses.append(flatten_course(doc, fields))
+
+    return courses
+
+def _get_executor():
+    global _executor
+    with _client_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=MONGO_IO_THREADS, thread_name_prefix="mongo-io")
+        return _executor
+
+async def run_in_db_thread(func, *args, **kwargs):
+    """Run a blocking driver call on the Mongo I/O threads instead of the event loop."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_executor(), partial(func, *args, **kwargs))
+
+async def get_courses_data_async(fields=None):
+    """Async version of get_courses_data for use inside request handlers."""
+    return await run_in_db_thread(get_courses_data, fields)
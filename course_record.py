@@ -0,0 +1,129 @@
+import hashlib
+import json
+import sys
+from collections.abc import Mapping
+
+# Flattened columns in their historical order; the video columns are derived from the lessons
+SCALAR_COLUMNS = (
+    "Id", "Name", "Description", "Category", "Level", "Price", "Estimated Price",
+    "Thumbnail", "Tags", "Benefits", "Prerequisites",
+)
+VIDEO_COLUMNS = ("Video Titles", "Video Sections", "Video Lengths", "Video Links")
+COLUMNS = SCALAR_COLUMNS + VIDEO_COLUMNS
+# Pseudo-column: fetches the lessons only to fingerprint them, so lesson edits still change the record
+DIGEST_COLUMN = "Lessons Digest"
+
+_ATTRIBUTES = (
+    "id", "name", "description", "category", "level", "price", "estimated_price",
+    "thumbnail", "tags", "benefits", "prerequisites",
+)
+_COLUMN_INDEX = {column: i for i, column in enumerate(SCALAR_COLUMNS)}
+
+
+def _lesson(v):
+    # (title, section, length, link urls): just what the video columns are built from
+    return (
+        v.get("title", ""),
+        v.get("videosection", ""),
+        v.get("videolength", 0),
+        tuple(link.get("url", "") for link in v.get("links", [])),
+    )
+
+
+class CourseRecord(Mapping):
+    """Immutable course row keyed by its Mongo ``_id``.
+
+    Reads like the flattened dict it replaces (``record['Name']``, ``record.get(...)``).
+    The joined video columns are built from a compact lesson tuple on access, and are
+    absent (``KeyError``) when the lessons were not fetched. ``lessons_digest`` is a
+    fingerprint of the raw lessons whenever the document carried them, kept even when
+    the lessons themselves are dropped.
+    """
+
+    __slots__ = _ATTRIBUTES + ("lessons", "lessons_digest")
+
+    def __init__(self, values, lessons=None, lessons_digest=None):
+        for attribute, value in zip(_ATTRIBUTES, values):
+            object.__setattr__(self, attribute, value)
+        object.__setattr__(self, "lessons", lessons)
+        object.__setattr__(self, "lessons_digest", lessons_digest)
+
+    @classmethod
+    def from_document(cls, doc, with_lessons=True):
+        """Flatten a course document; ``with_lessons=False`` keeps only the lesson digest."""
+        d = {k.lower(): v for k, v in doc.items()}
+        thumbnail = d.get("thumbnail")
+        values = (
+            str(doc.get("_id", "")),
+            d.get("name", ""),
+            d.get("description", ""),
+            _intern(d.get("categories", "")),
+            _intern(d.get("level", "")),
+            d.get("price", 0),
+            d.get("estimatedprice", 0),
+            thumbnail.get("url", "") if isinstance(thumbnail, dict) else "",
+            ", ".join(d.get("tags", [])),
+            " | ".join(b.get("title", "") for b in d.get("benefits", [])),
+            " | ".join(p.get("title", "") for p in d.get("prerequisites", [])),
+        )
+        lessons = tuple(_lesson(v) for v in d.get("coursedata") or []) if with_lessons else None
+        digest = _digest(d["coursedata"]) if "coursedata" in d else None
+        return cls(values, lessons, digest)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("CourseRecord is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError("CourseRecord is immutable")
+
+    # --- Mapping interface ---
+    def __getitem__(self, column):
+        index = _COLUMN_INDEX.get(column)
+        if index is not None:
+            return getattr(self, _ATTRIBUTES[index])
+        if column in VIDEO_COLUMNS and self.lessons is not None:
+            return self._video_column(column)
+        raise KeyError(column)
+
+    def _video_column(self, column):
+        if column == "Video Titles":
+            return " | ".join(lesson[0] for lesson in self.lessons)
+        if column == "Video Sections":
+            return " | ".join(lesson[1] for lesson in self.lessons)
+        if column == "Video Lengths":
+            return " | ".join(str(lesson[2]) for lesson in self.lessons)
+        return " | ".join(" & ".join(lesson[3]) for lesson in self.lessons)
+
+    def __iter__(self):
+        return iter(COLUMNS if self.lessons is not None else SCALAR_COLUMNS)
+
+    def __len__(self):
+        return len(COLUMNS) if self.lessons is not None else len(SCALAR_COLUMNS)
+
+    def _values(self):
+        return tuple(getattr(self, attribute) for attribute in _ATTRIBUTES) + (self.lessons, self.lessons_digest)
+
+    def __eq__(self, other):
+        if isinstance(other, CourseRecord):
+            return self._values() == other._values()
+        return Mapping.__eq__(self, other)
+
+    def __hash__(self):
+        return hash(self.id)
+
+    def __repr__(self):
+        return f"CourseRecord(id={self.id!r}, name={self.name!r})"
+
+    def __reduce__(self):
+        return CourseRecord, (self._values()[:-2], self.lessons, self.lessons_digest)
+
+
+def _digest(lessons):
+    raw = json.dumps(lessons, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.blake2b(raw.encode("utf-8"), digest_size=16).digest()
+
+
+def _intern(value):
+    # Categories and levels repeat across the catalog, so share one string object each
+    return sys.intern(value) if isinstance(value, str) else value
+
@@ -0,0 +1,146 @@
+import bisect
+import difflib
+import math
+import re
+from collections import defaultdict
+
+import numpy as np
+
+from index_factory import FAISS_METRIC, prepare_vectors
+from metrics import span
+
+# How much a term occurrence counts in each field (a simple BM25F)
+FIELD_WEIGHTS = {"Tags": 3.0, "Name": 2.0, "Category": 1.5, "Description": 1.0}
+
+
+def tokenize(text) -> list:
+    return re.findall(r"\w+", str(text).lower())
+
+
+def parse_price(price) -> float:
+    if isinstance(price, (int, float)):
+        return float(price)
+    text = str(price).strip().lower()
+    if text in ("", "free"):
+        return 0.0
+    try:
+        return float(re.sub(r"[^\d.]", "", text) or 0)
+    except ValueError:
+        return 0.0
+
+
+class CourseSearchEngine:
+    """Hybrid course retrieval: BM25 over course text fused with dense FAISS ranks.
+
+    ``rows[i]`` must correspond to vector ``i`` in ``index``.
+    """
+
+    def __init__(self, rows, index, k1=1.5, b=0.75, rrf_k=60, dense_k=100, metric=FAISS_METRIC):
+        self.rows = list(rows)
+        self.index = index
+        self.metric = metric
+        self.k1 = k1
+        self.b = b
+        self.rrf_k = rrf_k
+        self.dense_k = dense_k
+
+        self.postings = defaultdict(dict)  # term -> {doc: weighted term frequency}
+        self.doc_lengths = []
+        for doc, row in enumerate(self.rows):
+            length = 0.0
+            for field, weight in FIELD_WEIGHTS.items():
+                tokens = tokenize(row.get(field, ""))
+                length += weight * len(tokens)
+                for token in tokens:
+                    self.postings[token][doc] = self.postings[token].get(doc, 0.0) + weight
+            self.doc_lengths.append(length)
+        self.avg_length = (sum(self.doc_lengths) / len(self.doc_lengths)) if self.doc_lengths else 0.0
+        self.vocabulary = sorted(self.postings)
+
+    # --- Lexical side ---
+    def expand_term(self, term) -> list:
+        """Map a query term to indexed terms: exact, prefix ("java" -> "javascript") or close spelling."""
+        if term in self.postings:
+            matches = [term]
+        else:
+            matches = difflib.get_close_matches(term, self.vocabulary, n=2, cutoff=0.8)
+        if len(term) >= 3:
+            start = bisect.bisect_left(self.vocabulary, term)
+            while start < len(self.vocabulary) and self.vocabulary[start].startswith(term):
+                if self.vocabulary[start] not in matches:
+                    matches.append(self.vocabulary[start])
+                start += 1
+        return matches
+
+    def bm25_scores(self, terms) -> dict:
+        scores = defaultdict(float)
+        n_docs = len(self.rows)
+        for term in terms:
+            for indexed_term in self.expand_term(term):
+                # Expanded (prefix/typo) matches count for less than the exact term
+                boost = 1.0 if indexed_term == term else 0.5
+                postings = self.postings[indexed_term]
+                idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+                for doc, tf in postings.items():
+                    norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[doc] / (self.avg_length or 1.0))
+                    scores[doc] += boost * idf * tf * (self.k1 + 1) / (tf + norm)
+        return scores
+
+    # --- Filters ---
+    def matches_filters(self, row, filters) -> bool:
+        if not filters:
+            return True
+        level = filters.get("level")
+        if level and str(row.get("Level", "")).strip().lower() != str(level).strip().lower():
+            return False
+        category = filters.get("category")
+        if category and str(category).strip().lower() not in str(row.get("Category", "")).lower():
+            return False
+        max_price = filters.get("max_price")
+        if max_price is not None and parse_price(row.get("Price", 0)) > float(max_price):
+            return False
+        min_price = filters.get("min_price")
+        if min_price is not None and parse_price(row.get("Price", 0)) < float(min_price):
+            return False
+        return True
+
+    # --- Dense side ---
+    def dense_search(self, query_vectors):
+        """Rank the catalog for one or many query vectors with a single FAISS search."""
+        if self.index is None or not self.index.ntotal:
+            return None
+        query_vectors = prepare_vectors(np.asarray(query_vectors).reshape(-1, self.index.d), self.metric)
+        with span("faiss_search"):
+            _, ids = self.index.search(query_vectors, min(self.index.ntotal, self.dense_k))
+        return ids
+
+    # --- Hybrid search ---
+    def search(self, terms, query_vector=None, k=3, filters=None, dense_ids=None) -> list:
+        """Return up to ``k`` ``(row, score)`` pairs ranked by reciprocal-rank fusion.
+
+        Pass either ``query_vector`` or a row of precomputed ``dense_search`` ids.
+        Only courses with a lexical match are returned, so the dense side re-ranks
+        rather than surfacing unrelated courses.
+        """
+        lexical = self.bm25_scores(terms)
+        candidates = {doc for doc in lexical if self.matches_filters(self.rows[doc], filters)}
+        if not candidates:
+            return []
+
+        fused = defaultdict(float)
+        lexical_ranking = sorted(candidates, key=lambda doc: -lexical[doc])
+        for rank, doc in enumerate(lexical_ranking):
+            fused[doc] += 1.0 / (self.rrf_k + rank + 1)
+
+        if dense_ids is None and query_vector is not None:
+            ranked_ids = self.dense_search(query_vector)
+            dense_ids = ranked_ids[0] if ranked_ids is not None else None
+        if dense_ids is not None:
+            rank = 0
+            for doc in dense_ids:
+                if doc in candidates:
+                    fused[doc] += 1.0 / (self.rrf_k + rank + 1)
+                    rank += 1
+
+        ranked = sorted(fused.items(), key=lambda item: -item[1])[:k]
+        return [(self.rows[doc], score) for doc, score in ranked]
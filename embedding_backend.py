@@ -0,0 +1,203 @@
+"""Sentence embedding backends behind one interface.
+
+``torch`` runs the SentenceTransformer model as before. ``onnx`` and ``onnx-int8`` run
+an ONNX Runtime export of the same model (fp32 or dynamically int8-quantized) with a
+``tokenizers`` tokenizer, so neither torch nor transformers is imported at runtime.
+Create the export once, where torch is installed:
+
+    python embedding_backend.py export --model paraphrase-MiniLM-L6-v2
+"""
+import argparse
+import asyncio
+import json
+import os
+
+import numpy as np
+
+EMBEDDING_MODEL_NAME = os.getenv("EMBEDDING_MODEL_NAME", "paraphrase-MiniLM-L6-v2")
+# "torch" (SentenceTransformer), "onnx" or "onnx-int8"
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch")
+EMBEDDING_ONNX_DIR = os.getenv("EMBEDDING_ONNX_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".onnx_models"))
+# Texts per forward pass, and CPU threads per forward pass (0 keeps the library default)
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "32"))
+EMBEDDING_THREADS = int(os.getenv("EMBEDDING_THREADS", "0"))
+
+BACKENDS = ("torch", "onnx", "onnx-int8")
+
+
+def embedding_variant(model_name=EMBEDDING_MODEL_NAME, kind=EMBEDDING_BACKEND) -> str:
+    """Name of a model/backend pair, e.g. for snapshot paths; embeddings differ slightly between backends."""
+    return model_name if kind == "torch" else f"{model_name}-{kind}"
+
+
+class EmbeddingBackend:
+    """``encode(texts)`` returns an ``(len(texts), dimension)`` float32 array."""
+
+    dimension = None
+
+    def encode(self, texts) -> np.ndarray:
+        raise NotImplementedError
+
+    async def aencode(self, texts) -> np.ndarray:
+        """Encode off the event loop."""
+        return await asyncio.to_thread(self.encode, texts)
+
+
+class SentenceTransformerBackend(EmbeddingBackend):
+    """The reference fp32 PyTorch model."""
+
+    def __init__(self, model_name=EMBEDDING_MODEL_NAME, batch_size=EMBEDDING_BATCH_SIZE, threads=EMBEDDING_THREADS):
+        import torch
+        from sentence_transformers import SentenceTransformer
+
+        if threads:
+            torch.set_num_threads(threads)
+        self.model = SentenceTransformer(model_name)
+        self.batch_size = batch_size
+        self.dimension = self.model.get_sentence_embedding_dimension()
+
+    def encode(self, texts) -> np.ndarray:
+        texts = list(texts)
+        if not texts:
+            return np.empty((0, self.dimension), dtype="float32")
+        vectors = self.model.encode(texts, batch_size=self.batch_size, convert_to_numpy=True, show_progress_bar=False)
+        return np.asarray(vectors, dtype="float32")
+
+
+class OnnxBackend(EmbeddingBackend):
+    """ONNX Runtime inference on an export written by ``export_onnx``."""
+
+    def __init__(self, model_dir, quantized=False, batch_size=EMBEDDING_BATCH_SIZE, threads=EMBEDDING_THREADS):
+        try:
+            import onnxruntime as ort
+            from tokenizers import Tokenizer
+        except ImportError as e:
+            raise ImportError("The ONNX embedding backend needs the onnxruntime and tokenizers packages") from e
+
+        config_path = os.path.join(model_dir, "embedding_config.json")
+        if not os.path.exists(config_path):
+            raise FileNotFoundError(f"No ONNX export in {model_dir}; run `python embedding_backend.py export` first")
+        with open(config_path, encoding="utf-8") as f:
+            self.config = json.load(f)
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+            options.inter_op_num_threads = 1
+        model_file = "model-int8.onnx" if quantized else "model.onnx"
+        self.session = ort.InferenceSession(os.path.join(model_dir, model_file), options, providers=["CPUExecutionProvider"])
+        self.input_names = {node.name for node in self.session.get_inputs()}
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=self.config["max_seq_length"])
+        self.tokenizer.enable_padding(pad_id=self.config["pad_token_id"], pad_token=self.config["pad_token"])
+        self.batch_size = batch_size
+        self.dimension = self.config["dimension"]
+
+    def _forward(self, texts) -> np.ndarray:
+        encodings = self.tokenizer.encode_batch(texts)
+        mask = np.array([e.attention_mask for e in encodings], dtype="int64")
+        inputs = {"input_ids": np.array([e.ids for e in encodings], dtype="int64"), "attention_mask": mask}
+        if "token_type_ids" in self.input_names:
+            inputs["token_type_ids"] = np.array([e.type_ids for e in encodings], dtype="int64")
+        hidden = self.session.run(None, inputs)[0]
+
+        if self.config["pooling"] == "cls":
+            pooled = hidden[:, 0]
+        else:
+            weights = mask[:, :, None].astype("float32")
+            pooled = (hidden * weights).sum(axis=1) / np.clip(weights.sum(axis=1), 1e-9, None)
+        if self.config.get("normalize"):
+            pooled = pooled / np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+        return pooled.astype("float32")
+
+    def encode(self, texts) -> np.ndarray:
+        texts = list(texts)
+        if not texts:
+            return np.empty((0, self.dimension), dtype="float32")
+        # Batch texts of similar length together so little compute goes to padding
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        vectors = np.empty((len(texts), self.dimension), dtype="float32")
+        for start in range(0, len(order), self.batch_size):
+            batch = order[start:start + self.batch_size]
+            vectors[batch] = self._forward([texts[i] for i in batch])
+        return vectors
+
+
+def onnx_model_dir(model_name=EMBEDDING_MODEL_NAME, root=EMBEDDING_ONNX_DIR) -> str:
+    return os.path.join(root, model_name.replace("/", "__"))
+
+
+def create_embedding_backend(kind=EMBEDDING_BACKEND, model_name=EMBEDDING_MODEL_NAME, batch_size=EMBEDDING_BATCH_SIZE, threads=EMBEDDING_THREADS):
+    if kind == "torch":
+        return SentenceTransformerBackend(model_name, batch_size, threads)
+    if kind in ("onnx", "onnx-int8"):
+        return OnnxBackend(onnx_model_dir(model_name), quantized=kind == "onnx-int8", batch_size=batch_size, threads=threads)
+    raise ValueError(f"Unknown embedding backend '{kind}', expected one of {BACKENDS}")
+
+
+def export_onnx(model_name=EMBEDDING_MODEL_NAME, out_dir=None, opset=17) -> str:
+    """Export the SentenceTransformer's encoder to ONNX (fp32 and int8) with its tokenizer and pooling config."""
+    import torch
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    from sentence_transformers import SentenceTransformer
+    from sentence_transformers.models import Normalize, Pooling
+
+    out_dir = out_dir or onnx_model_dir(model_name)
+    os.makedirs(out_dir, exist_ok=True)
+
+    st_model = SentenceTransformer(model_name, device="cpu")
+    encoder = st_model[0].auto_model.eval()
+    tokenizer = st_model.tokenizer
+    pooling = next((m for m in st_model if isinstance(m, Pooling)), None)
+
+    sample = tokenizer(["an example sentence", "another"], padding=True, return_tensors="pt")
+    input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in sample]
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+
+    class Encoder(torch.nn.Module):
+        def __init__(self, model):
+            super().__init__()
+            self.model = model
+
+        def forward(self, *args):
+            return self.model(**dict(zip(input_names, args))).last_hidden_state
+
+    model_path = os.path.join(out_dir, "model.onnx")
+    with torch.no_grad():
+        torch.onnx.export(
+            Encoder(encoder), tuple(sample[name] for name in input_names), model_path,
+            input_names=input_names, output_names=["last_hidden_state"], dynamic_axes=dynamic_axes, opset_version=opset,
+        )
+    quantize_dynamic(model_path, os.path.join(out_dir, "model-int8.onnx"), weight_type=QuantType.QInt8)
+
+    tokenizer.backend_tokenizer.save(os.path.join(out_dir, "tokenizer.json"))
+    with open(os.path.join(out_dir, "embedding_config.json"), "w", encoding="utf-8") as f:
+        json.dump({
+            "model": model_name,
+            "dimension": st_model.get_sentence_embedding_dimension(),
+            "max_seq_length": st_model.max_seq_length,
+            "pooling": "cls" if pooling is not None and pooling.pooling_mode_cls_token else "mean",
+            "normalize": any(isinstance(m, Normalize) for m in st_model),
+            "pad_token": tokenizer.pad_token,
+            "pad_token_id": tokenizer.pad_token_id,
+        }, f, indent=2)
+    return out_dir
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    export = subparsers.add_parser("export", help="Write the ONNX export used by the onnx and onnx-int8 backends")
+    export.add_argument("--model", default=EMBEDDING_MODEL_NAME)
+    export.add_argument("--out", help=f"Defaults to a folder under {EMBEDDING_ONNX_DIR}")
+    args = parser.parse_args()
+
+    if args.command == "export":
+        print(f"Exported to {export_onnx(args.model, args.out)}")
+
+
+if __name__ == "__main__":
+    main()
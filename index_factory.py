@@ -0,0 +1,83 @@
+import logging
+import math
+import os
+
+import faiss
+import numpy as np
+
+# Index type: "flat" (exact), "hnsw" (graph) or "ivfpq" (inverted lists + product quantization)
+FAISS_INDEX_TYPE = os.getenv("FAISS_INDEX_TYPE", "flat")
+# "l2" on raw vectors, or "cosine" (inner product on L2-normalized vectors)
+FAISS_METRIC = os.getenv("FAISS_METRIC", "l2")
+
+HNSW_M = int(os.getenv("HNSW_M", "32"))
+HNSW_EF_CONSTRUCTION = int(os.getenv("HNSW_EF_CONSTRUCTION", "80"))
+HNSW_EF_SEARCH = int(os.getenv("HNSW_EF_SEARCH", "64"))
+
+IVF_NLIST = int(os.getenv("IVF_NLIST", "0"))  # 0 picks ~4*sqrt(n)
+IVF_NPROBE = int(os.getenv("IVF_NPROBE", "8"))
+PQ_M = int(os.getenv("PQ_M", "16"))  # sub-quantizers; must divide the embedding dimension
+PQ_NBITS = int(os.getenv("PQ_NBITS", "8"))
+
+INDEX_TYPES = ("flat", "hnsw", "ivfpq")
+METRICS = ("l2", "cosine")
+
+
+def index_variant(kind=FAISS_INDEX_TYPE, metric=FAISS_METRIC) -> str:
+    """Short name of an index configuration, e.g. for snapshot paths."""
+    if kind == "hnsw":
+        return f"hnsw{HNSW_M}-{metric}"
+    if kind == "ivfpq":
+        return f"ivf{IVF_NLIST or 'auto'}-pq{PQ_M}x{PQ_NBITS}-{metric}"
+    return f"flat-{metric}"
+
+
+def prepare_vectors(vectors, metric=FAISS_METRIC) -> np.ndarray:
+    """float32, C-contiguous copy of ``vectors``, L2-normalized for the cosine metric."""
+    vectors = np.array(vectors, dtype="float32", order="C", copy=True)
+    if vectors.ndim == 1:
+        vectors = vectors.reshape(1, -1)
+    if metric == "cosine":
+        faiss.normalize_L2(vectors)
+    return vectors
+
+
+def build_index(vectors, kind=FAISS_INDEX_TYPE, metric=FAISS_METRIC):
+    """Build and fill a FAISS index of the requested type.
+
+    Query vectors must go through ``prepare_vectors`` with the same metric.
+    """
+    if kind not in INDEX_TYPES:
+        raise ValueError(f"Unknown FAISS index type '{kind}', expected one of {INDEX_TYPES}")
+    if metric not in METRICS:
+        raise ValueError(f"Unknown FAISS metric '{metric}', expected one of {METRICS}")
+
+    vectors = prepare_vectors(vectors, metric)
+    n, dim = vectors.shape
+    faiss_metric = faiss.METRIC_INNER_PRODUCT if metric == "cosine" else faiss.METRIC_L2
+
+    if kind == "ivfpq":
+        nlist = IVF_NLIST or max(1, int(4 * math.sqrt(n)))
+        if dim % PQ_M != 0:
+            raise ValueError(f"PQ_M={PQ_M} must divide the embedding dimension {dim}")
+        if n < max(nlist, 2 ** PQ_NBITS):
+            logging.warning(f"Only {n} vectors, too few to train IVF-PQ; using a flat index instead.")
+            kind = "flat"
+        else:
+            quantizer = faiss.IndexFlatIP(dim) if metric == "cosine" else faiss.IndexFlatL2(dim)
+            index = faiss.IndexIVFPQ(quantizer, dim, nlist, PQ_M, PQ_NBITS, faiss_metric)
+            index.train(vectors)
+            index.add(vectors)
+            index.nprobe = min(IVF_NPROBE, nlist)
+            return index
+
+    if kind == "hnsw":
+        index = faiss.IndexHNSWFlat(dim, HNSW_M, faiss_metric)
+        index.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+        index.add(vectors)
+        index.hnsw.efSearch = HNSW_EF_SEARCH
+        return index
+
+    index = faiss.IndexFlatIP(dim) if metric == "cosine" else faiss.IndexFlatL2(dim)
+    index.add(vectors)
+    return index
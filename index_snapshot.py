@@ -0,0 +1,110 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+import tempfile
+import time
+
+import faiss
+import numpy as np
+
+# Where versioned embedding/index snapshots live, and how many old versions to keep
+INDEX_SNAPSHOT_DIR = os.getenv("INDEX_SNAPSHOT_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".index_snapshots"))
+INDEX_SNAPSHOT_KEEP = int(os.getenv("INDEX_SNAPSHOT_KEEP", "3"))
+
+# 2: meta.json records the index class, which decides how the index is mapped
+SNAPSHOT_FORMAT = 2
+
+
+def catalog_hash(ids, chunks) -> str:
+    """Content hash of the text that was embedded, in index order."""
+    digest = hashlib.sha256()
+    for course_id, chunk in zip(ids, chunks):
+        digest.update(str(course_id).encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(chunk.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def snapshot_name(model_name, content_hash, variant="") -> str:
+    slug = re.sub(r"[^A-Za-z0-9_.-]+", "_", model_name)
+    if variant:
+        slug = f"{slug}-{re.sub(r'[^A-Za-z0-9_.-]+', '_', variant)}"
+    return f"v{SNAPSHOT_FORMAT}-{slug}-{content_hash[:24]}"
+
+
+def index_read_flags(index_class) -> int:
+    """faiss.read_index flags that map ``index_class``'s vectors from disk instead of copying them.
+
+    IO_FLAG_MMAP only covers IVF inverted lists. Flat codes (IndexFlat, and the storage of
+    IndexHNSWFlat) need IO_FLAG_MMAP_IFC; HNSW's neighbor graph is still read onto the heap.
+    faiss before 1.11 has no IO_FLAG_MMAP_IFC, and those indexes are then read as before.
+    """
+    if index_class.startswith("IndexIVF"):
+        return faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY
+    return getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP) | faiss.IO_FLAG_READ_ONLY
+
+
+def load_snapshot(name, ids, directory=INDEX_SNAPSHOT_DIR):
+    """Return ``(embeddings, index)`` memory-mapped read-only from disk, or None if missing or stale."""
+    path = os.path.join(directory, name)
+    try:
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("ids") != list(ids):
+            return None
+        embeddings = np.load(os.path.join(path, "embeddings.npy"), mmap_mode="r")
+        index = faiss.read_index(os.path.join(path, "index.faiss"), index_read_flags(meta["index_class"]))
+    except (OSError, ValueError, RuntimeError, KeyError) as e:
+        if not isinstance(e, FileNotFoundError):
+            logging.warning(f"Ignoring unreadable index snapshot {name}: {e}")
+        return None
+    return embeddings, index
+
+
+def save_snapshot(name, ids, embeddings, index, model_name, directory=INDEX_SNAPSHOT_DIR):
+    """Write a snapshot atomically; concurrent writers of the same name are harmless."""
+    final_path = os.path.join(directory, name)
+    if os.path.isdir(final_path):
+        return final_path
+    try:
+        os.makedirs(directory, exist_ok=True)
+        tmp_path = tempfile.mkdtemp(prefix=f".{name}-", dir=directory)
+        np.save(os.path.join(tmp_path, "embeddings.npy"), np.ascontiguousarray(embeddings, dtype="float32"))
+        faiss.write_index(index, os.path.join(tmp_path, "index.faiss"))
+        with open(os.path.join(tmp_path, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump({
+                "format": SNAPSHOT_FORMAT,
+                "model": model_name,
+                "index_class": type(faiss.downcast_index(index)).__name__,
+                "created": time.time(),
+                "ids": list(ids),
+            }, f)
+        try:
+            os.rename(tmp_path, final_path)
+        except OSError:
+            # Another worker published the same snapshot first
+            shutil.rmtree(tmp_path, ignore_errors=True)
+        prune_snapshots(directory, keep=INDEX_SNAPSHOT_KEEP)
+    except OSError as e:
+        logging.warning(f"Could not write index snapshot {name}: {e}")
+    return final_path
+
+
+def prune_snapshots(directory=INDEX_SNAPSHOT_DIR, keep=INDEX_SNAPSHOT_KEEP):
+    """Remove all but the ``keep`` most recently written snapshots."""
+    try:
+        entries = [
+            os.path.join(directory, entry)
+            for entry in os.listdir(directory)
+            if not entry.startswith(".") and os.path.isdir(os.path.join(directory, entry))
+        ]
+    except OSError:
+        return
+    entries.sort(key=os.path.getmtime, reverse=True)
+    for path in entries[keep:]:
+        # Workers that already mapped these files keep their mappings alive
+        shutil.rmtree(path, ignore_errors=True)
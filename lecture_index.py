@@ -0,0 +1,177 @@
+import itertools
+import logging
+import os
+import threading
+
+import faiss
+import numpy as np
+from bson import ObjectId
+
+from course_db_data import get_collection
+from index_factory import FAISS_METRIC, build_index, prepare_vectors
+from metrics import span
+
+# Courses fetched per Mongo round trip, and lectures embedded per encoder call
+LECTURE_FETCH_BATCH = int(os.getenv("LECTURE_FETCH_BATCH", "100"))
+LECTURE_EMBED_BATCH = int(os.getenv("LECTURE_EMBED_BATCH", "1024"))
+
+# Only the fields needed to build lecture documents
+LECTURE_PROJECTION = {"name": 1, "courseData": 1, "coursedata": 1}
+
+
+def course_filter(course_ids):
+    """Mongo filter for the given catalog ids (``str(_id)``), which are ObjectIds in the collection."""
+    return {"_id": {"$in": [ObjectId(i) if ObjectId.is_valid(i) else i for i in course_ids]}}
+
+
+def iter_lecture_documents(batch_size=LECTURE_FETCH_BATCH, query=None):
+    """Stream one document per lesson from MongoDB, linked back to its course."""
+    cursor = get_collection().find(query or {}, LECTURE_PROJECTION, batch_size=batch_size)
+    try:
+        for doc in cursor:
+            d = {k.lower(): v for k, v in doc.items()}
+            for position, lesson in enumerate(d.get("coursedata") or []):
+                lesson = {k.lower(): v for k, v in lesson.items()}
+                yield {
+                    "course_id": str(doc.get("_id", "")),
+                    "course_name": d.get("name", ""),
+                    "position": position,
+                    "title": lesson.get("title", ""),
+                    "section": lesson.get("videosection", ""),
+                    "description": lesson.get("description", ""),
+                    "length": lesson.get("videolength", 0),
+                    "video_url": lesson.get("videourl", ""),
+                    "links": [
+                        {"title": link.get("title", ""), "url": link.get("url", "")}
+                        for link in lesson.get("links") or []
+                    ],
+                }
+    finally:
+        cursor.close()
+
+
+def lecture_text(lecture) -> str:
+    return f"""Course: {lecture['course_name']}
+Section: {lecture['section']}
+Lecture: {lecture['title']}
+{lecture['description']}"""
+
+
+class LectureIndex:
+    """Vector index over individual lectures, built from a stream in bounded-memory batches.
+
+    Vectors live in an ``IndexIDMap2`` keyed by lecture id, so ``update`` replaces one
+    course's lectures without re-embedding the rest. With FAISS_INDEX_TYPE=ivfpq the
+    quantizer is trained on the first embed batch. HNSW cannot remove vectors, so
+    ``update`` raises and the caller rebuilds instead.
+    """
+
+    def __init__(self, encode, embed_batch=LECTURE_EMBED_BATCH, metric=FAISS_METRIC):
+        self.encode = encode
+        self.embed_batch = embed_batch
+        self.metric = metric
+        self.index = None
+        self.lectures = {}  # lecture id -> lecture metadata
+        self.course_lectures = {}  # course id -> its lecture ids
+        self._next_id = 0
+        # FAISS indexes are not safe to search while vectors are added or removed
+        self._lock = threading.Lock()
+
+    def _add(self, batch):
+        vectors = self.encode([lecture_text(lecture) for lecture in batch])
+        if self.index is None:
+            # Trains IVF-PQ on the first batch; the vectors are re-added below under their ids
+            base = build_index(vectors, metric=self.metric)
+            base.reset()
+            self.index = faiss.IndexIDMap2(base)
+        ids = np.arange(self._next_id, self._next_id + len(batch), dtype="int64")
+        self._next_id += len(batch)
+        with self._lock:
+            self.index.add_with_ids(prepare_vectors(vectors, self.metric), ids)
+            for lecture_id, lecture in zip(ids.tolist(), batch):
+                lecture.pop("description", None)  # only needed for the embedding text
+                self.lectures[lecture_id] = lecture
+                self.course_lectures.setdefault(lecture["course_id"], []).append(lecture_id)
+
+    def _add_all(self, documents):
+        documents = iter(documents)
+        while True:
+            batch = list(itertools.islice(documents, self.embed_batch))
+            if not batch:
+                return
+            self._add(batch)
+
+    def build(self, documents):
+        self._add_all(documents)
+        return self
+
+    def update(self, course_ids, documents):
+        """Drop every lecture of ``course_ids`` and add ``documents`` (their current lectures)."""
+        stale = [lecture_id for course_id in course_ids for lecture_id in self.course_lectures.get(course_id, ())]
+        if stale and self.index is not None:
+            with self._lock:
+                self.index.remove_ids(np.array(stale, dtype="int64"))
+                for course_id in course_ids:
+                    for lecture_id in self.course_lectures.pop(course_id, ()):
+                        self.lectures.pop(lecture_id, None)
+        self._add_all(documents)
+
+    def search(self, query_vector, k=5) -> list:
+        """Return up to ``k`` ``(lecture, distance_or_similarity)`` pairs, best first."""
+        if self.index is None or not self.index.ntotal:
+            return []
+        query_vector = prepare_vectors(query_vector, self.metric)
+        with span("faiss_search"), self._lock:
+            scores, ids = self.index.search(query_vector, min(k, self.index.ntotal))
+            return [(self.lectures[i], float(score)) for i, score in zip(ids[0].tolist(), scores[0]) if i != -1]
+
+
+class LectureIndexManager:
+    """Holds the current LectureIndex and applies course changes to it in the background.
+
+    Changed and deleted courses are queued; a worker thread re-embeds only their lectures.
+    When the index cannot remove vectors (HNSW) it is rebuilt from scratch instead.
+    """
+
+    def __init__(self, encode):
+        self.encode = encode
+        self.current = None
+        self._lock = threading.Lock()
+        self._pending = set()
+        self._updating = False
+
+    def load(self):
+        self.current = LectureIndex(self.encode).build(iter_lecture_documents())
+        return self.current
+
+    def schedule_update(self, changed_rows, deleted_ids):
+        # Signature matches catalog listeners: callback(changed_rows, deleted_ids)
+        with self._lock:
+            self._pending.update(row.id for row in changed_rows)
+            self._pending.update(deleted_ids)
+            if self._updating:
+                return
+            self._updating = True
+        threading.Thread(target=self._run_updates, name="lecture-index-update", daemon=True).start()
+
+    def _run_updates(self):
+        while True:
+            with self._lock:
+                if not self._pending:
+                    self._updating = False
+                    return
+                course_ids, self._pending = list(self._pending), set()
+            try:
+                self._apply(course_ids)
+            except Exception:
+                logging.exception("Lecture index update failed")
+
+    def _apply(self, course_ids):
+        current = self.current
+        try:
+            current.update(course_ids, iter_lecture_documents(query=course_filter(course_ids)))
+            logging.info(f"Lecture index updated for {len(course_ids)} courses.")
+        except RuntimeError as e:
+            # e.g. HNSW, which does not implement remove_ids
+            logging.info(f"Rebuilding the lecture index ({e}).")
+            self.load()
@@ -0,0 +1,260 @@
+import asyncio
+import logging
+import os
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+import google.generativeai as genai
+from google.api_core import exceptions as google_exceptions
+
+from metrics import record_tokens, span
+from prompt_budget import Prompt
+
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.0-flash")
+# Point the client at another host (e.g. a local fake Gemini server) and pick the transport
+GEMINI_API_ENDPOINT = os.getenv("GEMINI_API_ENDPOINT")
+GEMINI_TRANSPORT = os.getenv("GEMINI_TRANSPORT")
+# Concurrent calls per worker, and an optional requests-per-minute quota (0 disables it)
+GEMINI_MAX_CONCURRENCY = int(os.getenv("GEMINI_MAX_CONCURRENCY", "8"))
+GEMINI_RATE_PER_MIN = float(os.getenv("GEMINI_RATE_PER_MIN", "0"))
+# Per-attempt timeout in seconds, retry count and backoff bounds
+GEMINI_TIMEOUT = float(os.getenv("GEMINI_TIMEOUT", "30"))
+GEMINI_RETRIES = int(os.getenv("GEMINI_RETRIES", "2"))
+GEMINI_BACKOFF_BASE = float(os.getenv("GEMINI_BACKOFF_BASE", "0.5"))
+GEMINI_BACKOFF_MAX = float(os.getenv("GEMINI_BACKOFF_MAX", "8"))
+
+RETRYABLE_ERRORS = (
+    asyncio.TimeoutError,
+    google_exceptions.DeadlineExceeded,
+    google_exceptions.InternalServerError,
+    google_exceptions.ResourceExhausted,
+    google_exceptions.ServiceUnavailable,
+    google_exceptions.TooManyRequests,
+)
+
+
+class Completion(str):
+    """Generated text; ``truncated`` is True when the output budget cut it off (finish reason MAX_TOKENS)."""
+
+    truncated = False
+
+    def __new__(cls, text, truncated=False):
+        completion = super().__new__(cls, text)
+        completion.truncated = truncated
+        return completion
+
+
+def is_truncated(text) -> bool:
+    return isinstance(text, Completion) and text.truncated
+
+
+def hit_token_limit(response) -> bool:
+    """Whether Gemini stopped because it reached max_output_tokens."""
+    candidates = getattr(response, "candidates", None) or []
+    reason = getattr(candidates[0], "finish_reason", None) if candidates else None
+    # A proto enum normally; 2 is FinishReason.MAX_TOKENS
+    return getattr(reason, "name", reason) in ("MAX_TOKENS", 2)
+
+
+class TokenBucket:
+    """Async token bucket: ``rate`` tokens per second, bursting up to ``capacity``."""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class LLMClient:
+    """Shared Gemini access: one model object per name, bounded concurrency, timeouts and retries."""
+
+    def __init__(
+        self,
+        model_name=GEMINI_MODEL,
+        max_concurrency=GEMINI_MAX_CONCURRENCY,
+        rate_per_min=GEMINI_RATE_PER_MIN,
+        timeout=GEMINI_TIMEOUT,
+        retries=GEMINI_RETRIES,
+    ):
+        self.model_name = model_name
+        self.timeout = timeout
+        self.retries = retries
+        self._models = {}
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._bucket = TokenBucket(rate_per_min / 60.0) if rate_per_min > 0 else None
+        # The REST transport has no asyncio client, so its calls run on dedicated threads
+        self._use_threads = GEMINI_TRANSPORT == "rest"
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="gemini") if self._use_threads else None
+
+    def configure(self, api_key):
+        options = {"api_endpoint": GEMINI_API_ENDPOINT} if GEMINI_API_ENDPOINT else None
+        genai.configure(api_key=api_key, transport=GEMINI_TRANSPORT, client_options=options)
+
+    def model(self, name=None, **kwargs):
+        """Return a cached GenerativeModel; extra kwargs (e.g. system_instruction) are part of the key."""
+        name = name or self.model_name
+        key = (name, tuple(sorted(kwargs.items())))
+        if key not in self._models:
+            self._models[key] = genai.GenerativeModel(name, **kwargs)
+        return self._models[key]
+
+    def _prepare(self, prompt, model, generation_config):
+        """Resolve a ``Prompt`` (or plain string) into model, request text, config and endpoint label."""
+        if isinstance(prompt, Prompt):
+            if model is None and prompt.system:
+                model = self.model(system_instruction=prompt.system)
+            return model or self.model(), prompt.text, prompt.generation_config(generation_config), prompt.endpoint
+        return model or self.model(), prompt, generation_config, "other"
+
+    def _report_usage(self, usage, endpoint, prompt):
+        prompt_tokens, completion_tokens = record_tokens(usage, endpoint)
+        logging.debug(
+            f"Gemini {endpoint}: {prompt_tokens} prompt + {completion_tokens} completion tokens"
+            + (f" (estimated input {prompt.input_tokens})" if isinstance(prompt, Prompt) else "")
+        )
+
+    @staticmethod
+    def _request_options(timeout):
+        # The SDK's own retry would re-send 503s for up to 600 s inside one attempt; backoff happens here instead
+        return {"timeout": timeout, "retry": None}
+
+    async def _call(self, model, prompt, timeout, generation_config):
+        request_options = self._request_options(timeout)
+        if self._use_threads:
+            loop = asyncio.get_running_loop()
+            call = partial(model.generate_content, prompt, generation_config=generation_config, request_options=request_options)
+            return await asyncio.wait_for(loop.run_in_executor(self._executor, call), timeout)
+        return await asyncio.wait_for(
+            model.generate_content_async(prompt, generation_config=generation_config, request_options=request_options),
+            timeout,
+        )
+
+    async def generate(self, prompt, *, model=None, timeout=None, retries=None, generation_config=None):
+        """Generate a response, retrying transient failures with jittered exponential backoff.
+
+        ``prompt`` is a string or a ``Prompt``, whose system instruction, output budget
+        and endpoint label are applied to the call.
+        """
+        model, contents, generation_config, endpoint = self._prepare(prompt, model, generation_config)
+        timeout = timeout or self.timeout
+        retries = self.retries if retries is None else retries
+
+        attempt = 0
+        while True:
+            if self._bucket is not None:
+                await self._bucket.acquire()
+            try:
+                async with self._semaphore:
+                    with span("gemini_generate"):
+                        response = await self._call(model, contents, timeout, generation_config)
+                self._report_usage(getattr(response, "usage_metadata", None), endpoint, prompt)
+                return response
+            except RETRYABLE_ERRORS as e:
+                if attempt >= retries:
+                    raise
+                delay = random.uniform(0, min(GEMINI_BACKOFF_MAX, GEMINI_BACKOFF_BASE * 2 ** attempt))
+                logging.warning(f"Gemini call failed ({type(e).__name__}), retrying in {delay:.2f}s")
+                attempt += 1
+                await asyncio.sleep(delay)
+
+    async def generate_text(self, prompt, **kwargs) -> Completion:
+        """Generated text as a ``Completion``; check ``truncated`` before caching it."""
+        response = await self.generate(prompt, **kwargs)
+        truncated = hit_token_limit(response)
+        if truncated:
+            endpoint = prompt.endpoint if isinstance(prompt, Prompt) else "other"
+            logging.warning(f"Gemini {endpoint} response hit max_output_tokens and was cut off")
+        return Completion(response.text.strip(), truncated)
+
+    async def _open_stream(self, model, prompt, timeout, generation_config):
+        request_options = self._request_options(timeout)
+        if self._use_threads:
+            loop = asyncio.get_running_loop()
+            call = partial(model.generate_content, prompt, stream=True, generation_config=generation_config, request_options=request_options)
+            return await asyncio.wait_for(loop.run_in_executor(self._executor, call), timeout)
+        return await asyncio.wait_for(
+            model.generate_content_async(prompt, stream=True, generation_config=generation_config, request_options=request_options),
+            timeout,
+        )
+
+    async def _iterate_stream(self, response, timeout):
+        if self._use_threads:
+            loop = asyncio.get_running_loop()
+            chunks = iter(response)
+            while True:
+                chunk = await asyncio.wait_for(loop.run_in_executor(self._executor, next, chunks, None), timeout)
+                if chunk is None:
+                    return
+                yield chunk
+        else:
+            async for chunk in response:
+                yield chunk
+
+    async def stream_text(self, prompt, *, model=None, timeout=None, retries=None, generation_config=None, on_finish=None):
+        """Yield text chunks as Gemini produces them.
+
+        Only opening the stream is retried; once text has been sent to the client a
+        failure is raised to the caller. ``on_finish(truncated=...)`` is called once the
+        stream completes, so callers can skip caching answers cut off by the output budget.
+        """
+        model, contents, generation_config, endpoint = self._prepare(prompt, model, generation_config)
+        timeout = timeout or self.timeout
+        retries = self.retries if retries is None else retries
+
+        attempt = 0
+        while True:
+            if self._bucket is not None:
+                await self._bucket.acquire()
+            await self._semaphore.acquire()
+            try:
+                with span("gemini_stream_open"):
+                    response = await self._open_stream(model, contents, timeout, generation_config)
+                break
+            except RETRYABLE_ERRORS as e:
+                self._semaphore.release()
+                if attempt >= retries:
+                    raise
+                delay = random.uniform(0, min(GEMINI_BACKOFF_MAX, GEMINI_BACKOFF_BASE * 2 ** attempt))
+                logging.warning(f"Gemini stream failed to open ({type(e).__name__}), retrying in {delay:.2f}s")
+                attempt += 1
+                await asyncio.sleep(delay)
+            except BaseException:
+                self._semaphore.release()
+                raise
+
+        usage = None
+        truncated = False
+        try:
+            async for chunk in self._iterate_stream(response, timeout):
+                # The final chunk carries the totals for the whole response, and the finish reason
+                usage = getattr(chunk, "usage_metadata", None) or usage
+                truncated = truncated or hit_token_limit(chunk)
+                text = chunk.text
+                if text:
+                    yield text
+            if truncated:
+                logging.warning(f"Gemini {endpoint} stream hit max_output_tokens and was cut off")
+            if on_finish is not None:
+                on_finish(truncated=truncated)
+        finally:
+            self._semaphore.release()
+            self._report_usage(usage, endpoint, prompt)
+
+
+# Shared client used by all endpoints
+llm = LLMClient()
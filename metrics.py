@@ -0,0 +1,136 @@
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+from prometheus_client import REGISTRY, multiprocess
+
+# Add a Server-Timing header to every response (otherwise only when the request sends X-Server-Timing)
+SERVER_TIMING = os.getenv("SERVER_TIMING", "0") == "1"
+# Set by gunicorn deployments so /metrics aggregates all workers instead of the one that answered
+PROMETHEUS_MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+REQUEST_LATENCY = Histogram(
+    "nexgenie_request_seconds", "HTTP request latency.", ["method", "route", "status"], buckets=LATENCY_BUCKETS
+)
+STAGE_LATENCY = Histogram(
+    "nexgenie_stage_seconds", "Latency of internal stages (mongo_fetch, embedding_encode, faiss_search, ...).",
+    ["stage"], buckets=LATENCY_BUCKETS,
+)
+LLM_TOKENS = Counter("nexgenie_llm_tokens_total", "Gemini tokens used, by endpoint.", ["endpoint", "kind"])
+CACHE_REQUESTS = Counter("nexgenie_cache_requests_total", "Cache lookups by cache and result.", ["cache", "result"])
+COALESCED_REQUESTS = Counter("nexgenie_coalesced_requests_total", "Calls that joined an identical in-flight call.", ["flight"])
+PROCESS_RSS = Gauge("nexgenie_process_rss_bytes", "Resident set size of the worker.", multiprocess_mode="livesum")
+
+_request_spans = ContextVar("request_spans", default=None)
+
+
+def rss_bytes() -> int:
+    """Current resident set size, from /proc on Linux, else psutil or peak RSS."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        import resource
+        # ru_maxrss is the peak, in KiB on Linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+@contextmanager
+def span(stage):
+    """Time a stage into the stage histogram and the current request's Server-Timing entries."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        STAGE_LATENCY.labels(stage).observe(elapsed)
+        spans = _request_spans.get()
+        if spans is not None:
+            spans.append((stage, elapsed))
+
+
+def record_tokens(usage, endpoint="other"):
+    """Count prompt/completion tokens from a Gemini ``usage_metadata`` object; returns both counts."""
+    if usage is None:
+        return 0, 0
+    prompt = getattr(usage, "prompt_token_count", 0) or 0
+    completion = getattr(usage, "candidates_token_count", 0) or 0
+    if prompt:
+        LLM_TOKENS.labels(endpoint, "prompt").inc(prompt)
+    if completion:
+        LLM_TOKENS.labels(endpoint, "completion").inc(completion)
+    return prompt, completion
+
+
+def record_cache(cache, hit):
+    CACHE_REQUESTS.labels(cache, "hit" if hit else "miss").inc()
+
+
+def record_coalesced(flight):
+    COALESCED_REQUESTS.labels(flight).inc()
+
+
+def render_metrics():
+    """Return ``(body, content_type)`` for the /metrics endpoint."""
+    PROCESS_RSS.set(rss_bytes())
+    if PROMETHEUS_MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
+
+
+def server_timing_header(spans, total) -> str:
+    """Sum spans per stage, e.g. ``mongo_fetch;dur=12.3, faiss_search;dur=0.8, total;dur=40.1``."""
+    durations = {}
+    for stage, elapsed in spans:
+        durations[stage] = durations.get(stage, 0.0) + elapsed
+    durations["total"] = total
+    return ", ".join(f"{stage};dur={elapsed * 1000:.1f}" for stage, elapsed in durations.items())
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording request latency and, on request, a Server-Timing header."""
+
+    def __init__(self, app, server_timing=SERVER_TIMING):
+        self.app = app
+        self.server_timing = server_timing
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        spans = []
+        token = _request_spans.set(spans)
+        started = time.perf_counter()
+        status = {"code": 500}
+        wants_timing = self.server_timing or any(name == b"x-server-timing" for name, _ in scope.get("headers", []))
+
+        async def send_with_metrics(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                if wants_timing:
+                    headers = list(message.get("headers", []))
+                    value = server_timing_header(spans, time.perf_counter() - started)
+                    headers.append((b"server-timing", value.encode("latin-1")))
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_metrics)
+        finally:
+            route = scope.get("route")
+            # Label by route template, never raw path, to keep label cardinality bounded
+            route_label = getattr(route, "path", "unmatched")
+            REQUEST_LATENCY.labels(scope.get("method", ""), route_label, str(status["code"])).observe(time.perf_counter() - started)
+            _request_spans.reset(token)
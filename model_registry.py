@@ -0,0 +1,101 @@
+import asyncio
+import logging
+import threading
+import time
+
+
+class ModelRegistry:
+    """Loads heavy resources (models, indexes) on first use or in a background warm-up.
+
+    Loaders are registered by name and run at most once per process; concurrent
+    callers wait for the same load. A failed load is reported in ``status`` and
+    retried on the next request for it.
+    """
+
+    def __init__(self):
+        self._loaders = {}
+        self._resources = {}
+        self._errors = {}
+        self._load_times = {}
+        self._locks = {}
+        self._warm_up_thread = None
+        self._background = set()  # names with a background load in flight
+        self._background_lock = threading.Lock()
+
+    def register(self, name, loader):
+        self._loaders[name] = loader
+        self._locks[name] = threading.Lock()
+
+    def is_loaded(self, name) -> bool:
+        return name in self._resources
+
+    def get(self, name):
+        """Return the resource, loading it in the calling thread if needed."""
+        if name in self._resources:
+            return self._resources[name]
+        with self._locks[name]:
+            if name not in self._resources:
+                started = time.perf_counter()
+                try:
+                    self._resources[name] = self._loaders[name]()
+                except Exception as e:
+                    self._errors[name] = str(e)
+                    raise
+                self._errors.pop(name, None)
+                self._load_times[name] = time.perf_counter() - started
+                logging.info(f"Loaded {name} in {self._load_times[name]:.1f}s")
+        return self._resources[name]
+
+    async def aget(self, name):
+        """Async ``get`` that loads on a worker thread instead of blocking the event loop."""
+        if name in self._resources:
+            return self._resources[name]
+        return await asyncio.to_thread(self.get, name)
+
+    def load_in_background(self, name):
+        """Start loading ``name`` on its own thread unless it is loaded or already being loaded that way."""
+        with self._background_lock:
+            if name in self._resources or name in self._background:
+                return
+            self._background.add(name)
+
+        def load():
+            try:
+                self.get(name)
+            except Exception:
+                logging.exception(f"Background load of {name} failed")
+            finally:
+                with self._background_lock:
+                    self._background.discard(name)
+
+        threading.Thread(target=load, name=f"load-{name}", daemon=True).start()
+
+    def warm_up(self, names=None):
+        for name in names or list(self._loaders):
+            try:
+                self.get(name)
+            except Exception:
+                logging.exception(f"Warm-up of {name} failed")
+
+    def start_warm_up(self, names=None):
+        """Load resources on a background thread so the app can serve requests meanwhile."""
+        if self._warm_up_thread is not None and self._warm_up_thread.is_alive():
+            return
+        self._warm_up_thread = threading.Thread(target=self.warm_up, args=(names,), name="model-warm-up", daemon=True)
+        self._warm_up_thread.start()
+
+    def status(self) -> dict:
+        status = {}
+        for name in self._loaders:
+            if name in self._resources:
+                status[name] = {"state": "ready", "load_seconds": round(self._load_times[name], 3)}
+            elif name in self._errors:
+                status[name] = {"state": "error", "error": self._errors[name]}
+            elif self._locks[name].locked():
+                status[name] = {"state": "loading"}
+            else:
+                status[name] = {"state": "pending"}
+        return status
+
+    def ready(self) -> bool:
+        return all(name in self._resources for name in self._loaders)
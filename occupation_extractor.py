@@ -0,0 +1,159 @@
+import os
+import re
+import threading
+from collections import OrderedDict
+
+from metrics import span
+
+OCCUPATION_CACHE_SIZE = int(os.getenv("OCCUPATION_CACHE_SIZE", "4096"))
+SPACY_MODEL = os.getenv("SPACY_MODEL", "en_core_web_sm")
+
+# Multi-word occupations matched as whole phrases (longest first)
+OCCUPATION_PHRASES = [
+    "ai engineer", "android developer", "blockchain developer", "business analyst", "cloud architect",
+    "cloud engineer", "cybersecurity analyst", "data analyst", "data engineer", "data scientist",
+    "database administrator", "devops engineer", "ethical hacker", "flutter developer", "frontend developer",
+    "backend developer", "full stack developer", "game developer", "graphic designer", "ios developer",
+    "machine learning engineer", "mobile app developer", "network engineer", "penetration tester",
+    "product manager", "project manager", "prompt engineer", "qa engineer", "security engineer",
+    "site reliability engineer", "software engineer", "software developer", "solutions architect",
+    "system administrator", "technical writer", "ui ux designer", "ux designer", "ui designer",
+    "web developer", "web designer",
+]
+
+# Head nouns that end an occupation phrase ("... developer", "... engineer")
+OCCUPATION_HEADS = [
+    "developer", "engineer", "scientist", "designer", "manager", "specialist", "analyst", "architect",
+    "administrator", "consultant", "programmer", "tester", "researcher", "hacker", "writer",
+]
+
+# Words that can't be part of the modifiers in front of a head noun
+BOUNDARY_WORDS = {
+    "a", "an", "the", "to", "be", "become", "becoming", "as", "for", "of", "in", "on", "how", "i", "me", "my",
+    "want", "wanna", "give", "show", "create", "make", "roadmap", "road", "map", "path", "career", "learning",
+    "plan", "guide", "steps", "good", "great", "successful", "proficient", "professional", "what", "is", "do",
+    "can", "you", "please", "and", "or", "with",
+}
+
+# Spellings folded together for the canonical key
+SPELLING_VARIANTS = [
+    (r"\bfront[\s-]?end\b", "frontend"),
+    (r"\bback[\s-]?end\b", "backend"),
+    (r"\bfull[\s-]?stack\b", "full stack"),
+    (r"\bui\s*/\s*ux\b", "ui ux"),
+    (r"\bml\b", "machine learning"),
+    (r"\bdev\s*ops\b", "devops"),
+    (r"\bcyber[\s-]security\b", "cybersecurity"),
+]
+
+_PHRASE_PATTERN = re.compile(
+    r"\b(" + "|".join(re.escape(p) for p in sorted(OCCUPATION_PHRASES, key=len, reverse=True)) + r")s?\b"
+)
+_HEAD_PATTERN = re.compile(r"\b(" + "|".join(OCCUPATION_HEADS) + r")s?\b")
+_MAX_MODIFIERS = 2
+
+
+def normalize_query(query: str) -> str:
+    text = query.lower()
+    for pattern, replacement in SPELLING_VARIANTS:
+        text = re.sub(pattern, replacement, text)
+    return " ".join(re.findall(r"[\w+#.]+", text))
+
+
+def canonical_occupation(occupation: str) -> str:
+    """Stable key for an occupation, e.g. "a Front-End Developers" -> "frontend developer"."""
+    text = normalize_query(occupation)
+    text = re.sub(r"^(a|an|the)\s+", "", text)
+    text = _HEAD_PATTERN.sub(lambda m: m.group(1), text)
+    return text or "professional"
+
+
+def load_spacy_pipeline():
+    """spaCy pipeline for the fallback; noun chunks only need the tagger and parser."""
+    import spacy
+    return spacy.load(SPACY_MODEL, exclude=["ner", "lemmatizer"])
+
+
+class OccupationExtractor:
+    """Finds the occupation in a roadmap query.
+
+    A precompiled phrase/head-noun matcher handles the common phrasings; spaCy noun
+    chunks are only used when it finds nothing. ``nlp_loader`` returns the spaCy
+    pipeline and is only called for that fallback.
+    """
+
+    def __init__(self, nlp_loader, cache_size=OCCUPATION_CACHE_SIZE):
+        self.nlp_loader = nlp_loader
+        self.cache_size = cache_size
+        self._cache = OrderedDict()  # normalized query -> canonical occupation, least recently used first
+        self._lock = threading.Lock()
+
+    def _get(self, text):
+        with self._lock:
+            occupation = self._cache.get(text)
+            if occupation is not None:
+                self._cache.move_to_end(text)
+            return occupation
+
+    def _put(self, text, occupation):
+        with self._lock:
+            self._cache[text] = occupation
+            self._cache.move_to_end(text)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return occupation
+
+    def _match(self, text: str):
+        match = _PHRASE_PATTERN.search(text) or _HEAD_PATTERN.search(text)
+        if match is None:
+            return None
+
+        # Keep qualifiers in front of the match ("full stack" web developer, "senior" engineer)
+        modifiers = []
+        for word in reversed(text[:match.start()].split()):
+            if word in BOUNDARY_WORDS or len(modifiers) == _MAX_MODIFIERS:
+                break
+            modifiers.insert(0, word)
+        return " ".join(modifiers + [match.group(1)])
+
+    def match(self, query: str):
+        """Rule-based match only; returns None when the query needs the spaCy fallback."""
+        return self._match(normalize_query(query))
+
+    def lookup(self, query: str):
+        """Cached or rule-based occupation, without touching spaCy; None when only the fallback can answer."""
+        text = normalize_query(query)
+        occupation = self._get(text)
+        if occupation is None:
+            matched = self._match(text)
+            if matched is not None:
+                occupation = self._put(text, canonical_occupation(matched))
+        return occupation
+
+    def fallback(self, query: str) -> str:
+        """spaCy path for a query ``lookup`` could not answer; the result is cached like the rest."""
+        return self._put(normalize_query(query), canonical_occupation(self._extract_with_spacy(query)))
+
+    def extract(self, query: str) -> str:
+        """Canonical occupation for ``query``, cached on its normalized text."""
+        occupation = self.lookup(query)
+        return occupation if occupation is not None else self.fallback(query)
+
+    def _extract(self, query: str) -> str:
+        """Uncached extraction, for benchmarks."""
+        occupation = self.match(query)
+        if occupation is None:
+            occupation = self._extract_with_spacy(query)
+        return canonical_occupation(occupation)
+
+    def _extract_with_spacy(self, query: str) -> str:
+        nlp = self.nlp_loader()
+        with span("spacy_parse"):
+            doc = nlp(query)
+
+        # Fallback to the first noun chunk excluding 'roadmap'
+        noun_chunks = [chunk.text.strip() for chunk in doc.noun_chunks if "roadmap" not in chunk.text.lower()]
+        occupation = noun_chunks[0] if noun_chunks else "professional"
+
+        # Remove leading articles like "a", "an", "the"
+        return re.sub(r"^(a|an|the)\s+", "", occupation, flags=re.IGNORECASE)
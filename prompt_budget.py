@@ -0,0 +1,143 @@
+import math
+import os
+import re
+from collections import Counter
+
+# Cap on user-supplied text (a question, a code task, a greeting) inside a prompt, in approximate tokens
+USER_INPUT_MAX_TOKENS = int(os.getenv("USER_INPUT_MAX_TOKENS", "400"))
+# Cap on each course field (description, benefits, prerequisites) sent for summarization
+COURSE_FIELD_MAX_TOKENS = int(os.getenv("COURSE_FIELD_MAX_TOKENS", "160"))
+# Cap on the list of course names behind a recommendation summary
+COURSE_LIST_MAX_TOKENS = int(os.getenv("COURSE_LIST_MAX_TOKENS", "600"))
+
+# max_output_tokens per endpoint; override one with e.g. MAX_OUTPUT_TOKENS_ASK_GENERAL=800
+OUTPUT_BUDGETS = {
+    "greet": 96,
+    "process_query": 1024,
+    "ask_general": 1024,
+    "get_roadmap": 2048,
+    "course_query_summary": 128,
+    "course_summary": 320,  # per course in a summary batch: three short summaries, the id and JSON syntax
+}
+OUTPUT_BUDGETS = {
+    endpoint: int(os.getenv(f"MAX_OUTPUT_TOKENS_{endpoint.upper()}", str(tokens)))
+    for endpoint, tokens in OUTPUT_BUDGETS.items()
+}
+
+# Words and single punctuation marks; the unit the token estimate is built from
+_PIECES = re.compile(r"\w+|[^\w\s]")
+# Sentence ends, line breaks and the " | " joining benefits/prerequisites
+_SENTENCES = re.compile(r"(?<=[.!?])\s+|\s*\n+\s*|\s+\|\s+")
+# Common English words are one SentencePiece token; longer ones split into pieces of about this many characters
+_CHARS_PER_SUBWORD = 6
+
+
+def count_tokens(text: str) -> int:
+    """Approximate Gemini token count, without a network round trip.
+
+    One token per punctuation mark and per word of up to six characters, one more per
+    further six characters. That lands about 10-20% above the real count for English
+    prose, and further above it for code and non-English text; use the API's
+    ``usage_metadata`` for exact figures after the call.
+    """
+    return sum(math.ceil(len(piece) / _CHARS_PER_SUBWORD) for piece in _PIECES.findall(text))
+
+
+def truncate_tokens(text: str, max_tokens: int, marker: str = " …") -> str:
+    """Cut ``text`` at the last whole word that fits in ``max_tokens``."""
+    used = 0
+    for match in _PIECES.finditer(text):
+        used += math.ceil(len(match.group()) / _CHARS_PER_SUBWORD)
+        if used > max_tokens:
+            # A single oversized "word" (a URL, minified code) is cut mid-word instead
+            end = match.start() or max_tokens * _CHARS_PER_SUBWORD
+            return text[:end].rstrip() + marker
+    return text
+
+
+def extract_sentences(text: str, max_tokens: int) -> str:
+    """Extractive pre-summary: keep the most informative sentences that fit, in their original order.
+
+    Sentences are scored by the average document frequency of their words, with a
+    small bonus for coming first, as course copy tends to lead with the point.
+    """
+    if count_tokens(text) <= max_tokens:
+        return text
+    # (sentence, separator that followed it), so kept sentences are rejoined as they were written
+    sentences, separators, start = [], [], 0
+    for match in _SENTENCES.finditer(text):
+        sentences.append(text[start:match.start()])
+        separators.append(match.group())
+        start = match.end()
+    sentences.append(text[start:])
+    separators.append("")
+    if len(sentences) < 2:
+        return truncate_tokens(text, max_tokens)
+
+    frequencies = Counter(word for word in re.findall(r"\w{3,}", text.lower()))
+
+    def score(i):
+        words = re.findall(r"\w{3,}", sentences[i].lower())
+        density = sum(frequencies[w] for w in words) / len(words) if words else 0
+        return density * (1 + 0.5 / (i + 1))
+
+    kept = set()
+    seen = set()
+    used = 0
+    for i in sorted(range(len(sentences)), key=score, reverse=True):
+        normalized = " ".join(sentences[i].lower().split())
+        tokens = count_tokens(sentences[i])
+        if normalized and normalized not in seen and used + tokens <= max_tokens:
+            kept.add(i)
+            seen.add(normalized)
+            used += tokens
+    if not kept:
+        return truncate_tokens(text, max_tokens)
+    return "".join(sentences[i] + separators[i] for i in sorted(kept)).strip(" |\n")
+
+
+def cap_user_input(text: str, max_tokens: int = USER_INPUT_MAX_TOKENS) -> str:
+    return truncate_tokens(text, max_tokens)
+
+
+def fit_items(items, max_tokens: int, separator: str = "\n") -> list:
+    """Leading items whose joined text fits in ``max_tokens`` (always at least one)."""
+    kept = []
+    used = 0
+    for item in items:
+        tokens = count_tokens(item) + count_tokens(separator)
+        if kept and used + tokens > max_tokens:
+            break
+        kept.append(item)
+        used += tokens
+    return kept
+
+
+class Prompt:
+    """A prompt split into a static ``system`` instruction and the per-request ``text``.
+
+    The system instruction is sent through ``GenerativeModel(system_instruction=...)``,
+    one cached model per instruction, so the unchanging prefix is identical on every
+    call and eligible for Gemini's implicit prefix caching. ``str(prompt)`` is the full
+    text, used for response-cache keys.
+    """
+
+    __slots__ = ("endpoint", "system", "text", "max_output_tokens")
+
+    def __init__(self, endpoint, system, text, max_output_tokens=None):
+        self.endpoint = endpoint
+        self.system = system
+        self.text = text
+        self.max_output_tokens = max_output_tokens or OUTPUT_BUDGETS.get(endpoint)
+
+    def __str__(self):
+        return f"{self.system}\n\n{self.text}" if self.system else self.text
+
+    @property
+    def input_tokens(self) -> int:
+        return count_tokens(str(self))
+
+    def generation_config(self, overrides=None) -> dict:
+        config = {"max_output_tokens": self.max_output_tokens} if self.max_output_tokens else {}
+        config.update(overrides or {})
+        return config
@@ -0,0 +1,217 @@
+import asyncio
+import hashlib
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from metrics import record_cache
+
+# On-disk tier shared by every worker on the host; set LLM_CACHE_PATH="" to keep the cache in memory only
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", os.path.join(tempfile.gettempdir(), "nexgenie_llm_cache.sqlite3"))
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 3600)))
+LLM_CACHE_MEMORY_ITEMS = int(os.getenv("LLM_CACHE_MEMORY_ITEMS", "1024"))
+LLM_CACHE_DISK_ITEMS = int(os.getenv("LLM_CACHE_DISK_ITEMS", "50000"))
+
+
+def normalize_prompt(prompt: str) -> str:
+    return " ".join(prompt.split())
+
+
+def cache_key(endpoint: str, model_name: str, prompt) -> str:
+    """Content-addressed key for an LLM response; ``prompt`` may be a string or a ``Prompt``."""
+    raw = "\0".join([endpoint, model_name, normalize_prompt(str(prompt))])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """Two-tier (in-memory LRU + SQLite) cache of LLM responses with TTL and tag invalidation.
+
+    ``aget``/``aset`` answer memory hits inline and run SQLite I/O on a single
+    background thread, so lock waits and evictions never block the event loop.
+    ``get``/``set`` do the same work in the calling thread.
+    """
+
+    def __init__(self, path=LLM_CACHE_PATH, ttl=LLM_CACHE_TTL, memory_items=LLM_CACHE_MEMORY_ITEMS, disk_items=LLM_CACHE_DISK_ITEMS):
+        self.ttl = ttl
+        self.memory_items = memory_items
+        self.disk_items = disk_items
+        self.hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()  # key -> (expires_at, value, tag)
+        self._lock = threading.Lock()  # guards the memory tier only
+        self._db_lock = threading.Lock()  # serializes use of the SQLite connection
+        self._writes = 0
+        self.path = path
+        self._db = None
+        self._db_pid = None
+        self._executor = None
+        self._executor_pid = None
+
+    def _connection(self):
+        """Open the SQLite tier lazily, once per process (connections must not cross a fork)."""
+        if not self.path:
+            return None
+        if self._db is None or self._db_pid != os.getpid():
+            try:
+                db = sqlite3.connect(self.path, timeout=5, check_same_thread=False, isolation_level=None)
+                db.execute("PRAGMA journal_mode=WAL")
+                db.execute("PRAGMA synchronous=NORMAL")
+                db.execute(
+                    "CREATE TABLE IF NOT EXISTS responses ("
+                    "key TEXT PRIMARY KEY, value TEXT NOT NULL, tag TEXT, expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+                )
+                db.execute("CREATE INDEX IF NOT EXISTS responses_tag ON responses (tag)")
+                db.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed_at)")
+            except sqlite3.Error as e:
+                logging.warning(f"LLM response cache disk tier disabled: {e}")
+                self.path = None
+                return None
+            self._db = db
+            self._db_pid = os.getpid()
+        return self._db
+
+    def _disk_executor(self):
+        """One thread per process for SQLite I/O (threads do not survive a fork)."""
+        if self._executor is None or self._executor_pid != os.getpid():
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="response-cache")
+            self._executor_pid = os.getpid()
+        return self._executor
+
+    def _remember(self, key, expires_at, value, tag):
+        with self._lock:
+            self._memory[key] = (expires_at, value, tag)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_items:
+                self._memory.popitem(last=False)
+
+    def _memory_get(self, key, now):
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= now:
+                del self._memory[key]
+                return None
+            self._memory.move_to_end(key)
+            self.hits += 1
+        record_cache("response", True)
+        return entry[1]
+
+    def _disk_get_many(self, keys, now) -> dict:
+        found = {}
+        with self._db_lock:
+            db = self._connection()
+            if db is not None:
+                for key in keys:
+                    try:
+                        row = db.execute("SELECT value, tag, expires_at FROM responses WHERE key = ?", (key,)).fetchone()
+                        if row is not None and row[2] > now:
+                            db.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+                            self._remember(key, row[2], row[0], row[1])
+                            found[key] = row[0]
+                        elif row is not None:
+                            db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    except sqlite3.Error as e:
+                        logging.warning(f"LLM response cache read failed: {e}")
+        with self._lock:
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        for key in keys:
+            record_cache("response", key in found)
+        return found
+
+    def _disk_set(self, key, value, tag, expires_at, now):
+        with self._db_lock:
+            db = self._connection()
+            if db is None:
+                return
+            try:
+                db.execute(
+                    "INSERT OR REPLACE INTO responses (key, value, tag, expires_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                    (key, value, tag, expires_at, now),
+                )
+                self._writes += 1
+                if self._writes % 100 == 0:
+                    self._evict(db, now)
+            except sqlite3.Error as e:
+                logging.warning(f"LLM response cache write failed: {e}")
+
+    def get(self, key):
+        now = time.time()
+        value = self._memory_get(key, now)
+        if value is not None:
+            return value
+        return self._disk_get_many([key], now).get(key)
+
+    async def aget(self, key):
+        """``get`` with the disk lookup off the event loop."""
+        return (await self.aget_many([key]))[0]
+
+    async def aget_many(self, keys) -> list:
+        """Cached values (or None) for ``keys``, with all memory misses looked up on disk in one hop."""
+        now = time.time()
+        values = [self._memory_get(key, now) for key in keys]
+        missing = [key for key, value in zip(keys, values) if value is None]
+        if not missing:
+            return values
+        if self.path:
+            loop = asyncio.get_running_loop()
+            found = await loop.run_in_executor(self._disk_executor(), self._disk_get_many, missing, now)
+        else:
+            found = self._disk_get_many(missing, now)
+        return [found.get(key) if value is None else value for key, value in zip(keys, values)]
+
+    def set(self, key, value, tag=None, ttl=None):
+        now = time.time()
+        expires_at = now + (self.ttl if ttl is None else ttl)
+        self._remember(key, expires_at, value, tag)
+        self._disk_set(key, value, tag, expires_at, now)
+
+    async def aset(self, key, value, tag=None, ttl=None):
+        """``set`` with the disk write off the event loop; the memory tier is updated at once."""
+        now = time.time()
+        expires_at = now + (self.ttl if ttl is None else ttl)
+        self._remember(key, expires_at, value, tag)
+        if self.path:
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(self._disk_executor(), self._disk_set, key, value, tag, expires_at, now)
+
+    def _evict(self, db, now):
+        db.execute("DELETE FROM responses WHERE expires_at <= ?", (now,))
+        db.execute(
+            "DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+            (self.disk_items,),
+        )
+
+    def invalidate_tag(self, tag):
+        """Drop every entry stored with ``tag`` from both tiers."""
+        # Memory is cleared last, under the disk lock, so an in-flight disk read cannot bring an entry back
+        with self._db_lock:
+            db = self._connection()
+            if db is not None:
+                try:
+                    db.execute("DELETE FROM responses WHERE tag = ?", (tag,))
+                except sqlite3.Error as e:
+                    logging.warning(f"LLM response cache invalidation failed: {e}")
+            with self._lock:
+                for key in [key for key, entry in self._memory.items() if entry[2] == tag]:
+                    del self._memory[key]
+
+    def close(self):
+        if self._executor is not None and self._executor_pid == os.getpid():
+            self._executor.shutdown(wait=True)
+        self._executor = None
+        with self._db_lock:
+            if self._db is not None and self._db_pid == os.getpid():
+                self._db.close()
+            self._db = None
+            self._db_pid = None
+
+
+# Shared cache used by all endpoints
+response_cache = ResponseCache()
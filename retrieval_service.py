@@ -0,0 +1,421 @@
+"""Out-of-process retrieval service shared by all web workers on a host.
+
+One process owns the embedding model, the spaCy pipeline and the lecture index, and
+serves them over a Unix socket. Encode requests from every worker are micro-batched:
+the first request opens a window of up to ``RETRIEVAL_MAX_WAIT_MS``, and everything
+that arrives in it (up to ``RETRIEVAL_MAX_BATCH`` texts) goes through the model in
+one forward pass. ``search_lectures`` embeds the query through the same batcher and
+searches the lecture index here, so the lesson corpus is embedded once per host
+(and on change, only for the courses that changed) rather than once per worker.
+The service follows catalog changes itself.
+
+Web workers started with ``RETRIEVAL_SERVICE_SOCKET`` set use ``RetrievalClient``
+in place of a local model and lecture index. The course index stays in the workers:
+it is small, feeds the BM25 half of hybrid search there, and is loaded from on-disk
+snapshots mapped with ``IO_FLAG_MMAP_IFC``/``IO_FLAG_MMAP``, so the page cache holds
+one copy for all of them.
+
+    python retrieval_service.py --socket /tmp/nexgenie-retrieval.sock
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import os
+import socket
+import struct
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+# Set in web workers to use the service instead of loading models in-process
+RETRIEVAL_SERVICE_SOCKET = os.getenv("RETRIEVAL_SERVICE_SOCKET")
+RETRIEVAL_MAX_BATCH = int(os.getenv("RETRIEVAL_MAX_BATCH", "64"))
+RETRIEVAL_MAX_WAIT_MS = float(os.getenv("RETRIEVAL_MAX_WAIT_MS", "5"))
+RETRIEVAL_TIMEOUT = float(os.getenv("RETRIEVAL_TIMEOUT", "30"))
+# How long workers wait for the service to come up before giving up
+RETRIEVAL_CONNECT_TIMEOUT = float(os.getenv("RETRIEVAL_CONNECT_TIMEOUT", "120"))
+# How long a worker waits for the service's first lecture index build before reporting it unavailable
+RETRIEVAL_LECTURES_TIMEOUT = float(os.getenv("RETRIEVAL_LECTURES_TIMEOUT", "600"))
+
+# Frame: header length, payload length, JSON header, raw payload (float32 vectors)
+_FRAME = struct.Struct("!II")
+
+
+class RetrievalServiceError(RuntimeError):
+    pass
+
+
+def pack_frame(header: dict, payload: bytes = b"") -> bytes:
+    raw = json.dumps(header).encode("utf-8")
+    return _FRAME.pack(len(raw), len(payload)) + raw + payload
+
+
+async def read_frame(reader):
+    header_size, payload_size = _FRAME.unpack(await reader.readexactly(_FRAME.size))
+    header = json.loads(await reader.readexactly(header_size))
+    payload = await reader.readexactly(payload_size) if payload_size else b""
+    return header, payload
+
+
+def _recv_exactly(sock, size) -> bytes:
+    chunks = []
+    while size:
+        chunk = sock.recv(min(size, 1 << 20))
+        if not chunk:
+            raise ConnectionError("Retrieval service closed the connection")
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+
+def recv_frame(sock):
+    header_size, payload_size = _FRAME.unpack(_recv_exactly(sock, _FRAME.size))
+    header = json.loads(_recv_exactly(sock, header_size))
+    return header, _recv_exactly(sock, payload_size) if payload_size else b""
+
+
+def vectors_from(header, payload) -> np.ndarray:
+    if not header.get("ok"):
+        raise RetrievalServiceError(header.get("error", "Retrieval service request failed"))
+    return np.frombuffer(payload, dtype="float32").reshape(header["shape"]).copy()
+
+
+# --- Server ---
+class MicroBatcher:
+    """Groups concurrent encode requests into batched calls of ``encode``."""
+
+    def __init__(self, encode, max_batch=RETRIEVAL_MAX_BATCH, max_wait=RETRIEVAL_MAX_WAIT_MS / 1000):
+        self.encode = encode
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.queue = asyncio.Queue()
+        # One model call at a time; the backend parallelizes inside a batch
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="encode")
+        self.batches = 0
+        self.texts = 0
+
+    async def submit(self, texts) -> np.ndarray:
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((texts, future))
+        return await future
+
+    async def _collect(self):
+        loop = asyncio.get_running_loop()
+        items = [await self.queue.get()]
+        size = len(items[0][0])
+        deadline = loop.time() + self.max_wait
+        while size < self.max_batch:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                item = await asyncio.wait_for(self.queue.get(), remaining)
+            except asyncio.TimeoutError:
+                break
+            items.append(item)
+            size += len(item[0])
+        return items
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            items = await self._collect()
+            items = [(texts, future) for texts, future in items if not future.cancelled()]
+            if not items:
+                continue
+            # Identical texts in the window (e.g. the same query from several workers) are encoded once
+            unique = list(dict.fromkeys(text for texts, _ in items for text in texts))
+            try:
+                vectors = await loop.run_in_executor(self._executor, self.encode, unique)
+            except Exception as e:
+                for _, future in items:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            self.batches += 1
+            self.texts += len(unique)
+            row = {text: i for i, text in enumerate(unique)}
+            for texts, future in items:
+                if not future.done():
+                    future.set_result(vectors[[row[text] for text in texts]])
+
+
+class RetrievalServer:
+    def __init__(self, backend, nlp, lectures=None, max_batch=RETRIEVAL_MAX_BATCH, max_wait_ms=RETRIEVAL_MAX_WAIT_MS):
+        self.backend = backend
+        self.nlp = nlp
+        self.lectures = lectures  # LectureIndexManager; ``current`` is None until the first build finishes
+        self.lectures_error = None  # Why the first build failed, reported to workers through ``info``
+        self.batcher = MicroBatcher(backend.encode, max_batch, max_wait_ms / 1000)
+        self._nlp_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="spacy")
+        self._search_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="search")
+
+    def lectures_ready(self) -> bool:
+        return self.lectures is not None and self.lectures.current is not None
+
+    async def handle(self, header, payload):
+        op = header.get("op")
+        if op == "encode":
+            vectors = await self.batcher.submit(header["texts"])
+            return {"ok": True, "shape": list(vectors.shape)}, np.ascontiguousarray(vectors, dtype="float32").tobytes()
+        if op == "noun_chunks":
+            doc = await asyncio.get_running_loop().run_in_executor(self._nlp_executor, self.nlp, header["text"])
+            return {"ok": True, "chunks": [chunk.text for chunk in doc.noun_chunks]}, b""
+        if op == "search_lectures":
+            if not self.lectures_ready():
+                if self.lectures_error:
+                    return {"ok": False, "error": f"Lecture index failed to load: {self.lectures_error}"}, b""
+                return {"ok": False, "error": "Lecture index is still loading"}, b""
+            vector = await self.batcher.submit([header["text"]])
+            index = self.lectures.current
+            matches = await asyncio.get_running_loop().run_in_executor(self._search_executor, index.search, vector, header["k"])
+            return {"ok": True, "matches": matches}, b""
+        if op == "info":
+            return {
+                "ok": True,
+                "dimension": self.backend.dimension,
+                "lectures_ready": self.lectures_ready(),
+                "lectures_error": self.lectures_error,
+                "batches": self.batcher.batches,
+                "texts": self.batcher.texts,
+            }, b""
+        return {"ok": False, "error": f"Unknown op {op!r}"}, b""
+
+    async def _respond(self, header, payload, writer, write_lock):
+        try:
+            response, body = await self.handle(header, payload)
+        except Exception as e:
+            logging.exception("Retrieval request failed")
+            response, body = {"ok": False, "error": f"{type(e).__name__}: {e}"}, b""
+        response["id"] = header.get("id")
+        async with write_lock:
+            writer.write(pack_frame(response, body))
+            await writer.drain()
+
+    async def connection(self, reader, writer):
+        write_lock = asyncio.Lock()
+        tasks = set()
+        try:
+            while True:
+                header, payload = await read_frame(reader)
+                task = asyncio.create_task(self._respond(header, payload, writer, write_lock))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            for task in tasks:
+                task.cancel()
+            writer.close()
+
+    async def serve(self, path):
+        if os.path.exists(path):
+            os.unlink(path)
+        server = await asyncio.start_unix_server(self.connection, path=path)
+        os.chmod(path, 0o660)
+        batcher = asyncio.create_task(self.batcher.run())
+        logging.info(f"Retrieval service listening on {path}")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            batcher.cancel()
+
+
+# --- Client ---
+class _RemoteChunk:
+    def __init__(self, text):
+        self.text = text
+
+
+class _RemoteDoc:
+    def __init__(self, chunks):
+        self.noun_chunks = [_RemoteChunk(text) for text in chunks]
+
+
+class _AsyncConnection:
+    """One multiplexed connection per event loop; responses are matched to requests by id."""
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.pending = {}
+        self.lock = asyncio.Lock()
+        self.reader_task = asyncio.get_running_loop().create_task(self._read())
+
+    async def _read(self):
+        try:
+            while True:
+                header, payload = await read_frame(self.reader)
+                future = self.pending.pop(header.get("id"), None)
+                if future is not None and not future.done():
+                    future.set_result((header, payload))
+        except Exception as e:
+            for future in self.pending.values():
+                if not future.done():
+                    future.set_exception(ConnectionError(f"Retrieval service connection lost: {e}"))
+            self.pending.clear()
+
+    @property
+    def closed(self):
+        return self.reader_task.done()
+
+
+class RetrievalClient:
+    """Embedding backend (``encode``/``aencode``/``dimension``) and lecture search backed by the retrieval service.
+
+    Sync calls use one blocking socket per thread, async calls one multiplexed
+    connection per event loop. Connections are re-opened after a fork.
+    """
+
+    def __init__(self, path=RETRIEVAL_SERVICE_SOCKET, timeout=RETRIEVAL_TIMEOUT, connect_timeout=RETRIEVAL_CONNECT_TIMEOUT):
+        self.path = path
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self._ids = itertools.count()
+        self._local = threading.local()
+        self._async = {}  # (pid, loop) -> _AsyncConnection
+        self._dimension = None
+
+    # --- Sync ---
+    def _socket(self):
+        sock = getattr(self._local, "sock", None)
+        if sock is None or self._local.pid != os.getpid():
+            deadline = time.monotonic() + self.connect_timeout
+            while True:
+                sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                try:
+                    sock.connect(self.path)
+                    break
+                except OSError:
+                    sock.close()
+                    if time.monotonic() > deadline:
+                        raise
+                    time.sleep(0.5)
+            sock.settimeout(self.timeout)
+            self._local.sock, self._local.pid = sock, os.getpid()
+        return sock
+
+    def _call(self, header):
+        header["id"] = next(self._ids)
+        sock = self._socket()
+        try:
+            sock.sendall(pack_frame(header))
+            return recv_frame(sock)
+        except (OSError, ConnectionError):
+            self._local.sock = None
+            sock.close()
+            raise
+
+    def encode(self, texts) -> np.ndarray:
+        texts = list(texts)
+        if not texts:
+            return np.empty((0, self.dimension), dtype="float32")
+        return vectors_from(*self._call({"op": "encode", "texts": texts}))
+
+    @property
+    def dimension(self) -> int:
+        if self._dimension is None:
+            header, _ = self._call({"op": "info"})
+            self._dimension = header["dimension"]
+        return self._dimension
+
+    def wait_for_lectures(self, poll_interval=1.0, timeout=RETRIEVAL_LECTURES_TIMEOUT):
+        """Block until the service has built its lecture index; raises if the build failed or takes too long."""
+        deadline = time.monotonic() + timeout
+        while True:
+            header, _ = self._call({"op": "info"})
+            if header.get("lectures_ready"):
+                return self
+            if header.get("lectures_error"):
+                raise RetrievalServiceError(f"Lecture index failed to load: {header['lectures_error']}")
+            if time.monotonic() > deadline:
+                raise RetrievalServiceError(f"Lecture index not ready after {timeout:g}s")
+            time.sleep(poll_interval)
+
+    def nlp(self, text):
+        """Stand-in for a spaCy pipeline call; the result only carries ``noun_chunks``."""
+        header, _ = self._call({"op": "noun_chunks", "text": text})
+        if not header.get("ok"):
+            raise RetrievalServiceError(header.get("error", "Retrieval service request failed"))
+        return _RemoteDoc(header["chunks"])
+
+    # --- Async ---
+    async def _connection(self):
+        loop = asyncio.get_running_loop()
+        key = (os.getpid(), loop)
+        connection = self._async.get(key)
+        if connection is None or connection.closed:
+            reader, writer = await asyncio.wait_for(asyncio.open_unix_connection(self.path), self.timeout)
+            connection = self._async[key] = _AsyncConnection(reader, writer)
+        return connection
+
+    async def _acall(self, header):
+        connection = await self._connection()
+        header["id"] = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        connection.pending[header["id"]] = future
+        try:
+            async with connection.lock:
+                connection.writer.write(pack_frame(header))
+                await connection.writer.drain()
+            return await asyncio.wait_for(future, self.timeout)
+        finally:
+            connection.pending.pop(header["id"], None)
+
+    async def aencode(self, texts) -> np.ndarray:
+        texts = list(texts)
+        if not texts:
+            return np.empty((0, self.dimension), dtype="float32")
+        return vectors_from(*await self._acall({"op": "encode", "texts": texts}))
+
+    async def asearch_lectures(self, text, k) -> list:
+        """``(lecture, score)`` pairs for ``text``, as ``LectureIndex.search`` returns them."""
+        header, _ = await self._acall({"op": "search_lectures", "text": text, "k": k})
+        if not header.get("ok"):
+            raise RetrievalServiceError(header.get("error", "Retrieval service request failed"))
+        return [(lecture, score) for lecture, score in header["matches"]]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--socket", default=RETRIEVAL_SERVICE_SOCKET or "/tmp/nexgenie-retrieval.sock")
+    parser.add_argument("--max-batch", type=int, default=RETRIEVAL_MAX_BATCH)
+    parser.add_argument("--max-wait-ms", type=float, default=RETRIEVAL_MAX_WAIT_MS)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    from course_catalog import CourseCatalog
+    from embedding_backend import create_embedding_backend
+    from lecture_index import LectureIndexManager
+    from occupation_extractor import load_spacy_pipeline
+
+    # Models load before the socket exists, so workers connecting means the service can encode
+    backend = create_embedding_backend()
+    lectures = LectureIndexManager(backend.encode)
+    server = RetrievalServer(backend, load_spacy_pipeline(), lectures, args.max_batch, args.max_wait_ms)
+
+    def load_lectures():
+        # Built in the background: a large lesson corpus takes longer than workers wait to connect
+        try:
+            catalog = CourseCatalog()
+            catalog.load()
+            lectures.load()
+            catalog.subscribe(lectures.schedule_update)
+            catalog.start()
+        except Exception as e:
+            logging.exception("Lecture index failed to load; search_lectures will keep failing")
+            server.lectures_error = f"{type(e).__name__}: {e}"
+            return
+        logging.info(f"Lecture index ready ({lectures.current.index.ntotal if lectures.current.index else 0} lectures).")
+
+    threading.Thread(target=load_lectures, name="lecture-index-load", daemon=True).start()
+    asyncio.run(server.serve(args.socket))
+
+
+if __name__ == "__main__":
+    main()
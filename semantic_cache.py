@@ -0,0 +1,103 @@
+import os
+import threading
+from collections import OrderedDict
+
+import faiss
+import numpy as np
+
+from metrics import record_cache, span
+
+# Minimum cosine similarity for a previous answer to be reused
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.92"))
+# Maximum number of answers kept per namespace
+SEMANTIC_CACHE_MAX_ITEMS = int(os.getenv("SEMANTIC_CACHE_MAX_ITEMS", "5000"))
+
+
+class _Namespace:
+    def __init__(self, dim):
+        self.index = faiss.IndexIDMap2(faiss.IndexFlatIP(dim))
+        self.answers = OrderedDict()  # id -> answer, least recently used first
+        self.next_id = 0
+        self.hits = 0
+        self.misses = 0
+
+
+class SemanticCache:
+    """Answer cache keyed on query meaning rather than exact text.
+
+    ``encode`` turns a list of strings into a 2-D array of embeddings (``aencode`` is
+    its async counterpart); vectors are L2-normalized so inner product equals cosine
+    similarity.
+    """
+
+    def __init__(self, encode, threshold=SEMANTIC_CACHE_THRESHOLD, max_items=SEMANTIC_CACHE_MAX_ITEMS, aencode=None):
+        self.encode = encode
+        self.aencode = aencode
+        self.threshold = threshold
+        self.max_items = max_items
+        self._namespaces = {}
+        self._lock = threading.Lock()
+
+    def embed(self, query: str) -> np.ndarray:
+        return self.embed_batch([query])
+
+    def embed_batch(self, queries) -> np.ndarray:
+        """Embed several queries in one encoder call; row ``i`` (as ``vectors[i:i + 1]``) is a lookup key."""
+        return self._normalized(self.encode(list(queries)), len(queries))
+
+    async def aembed(self, query: str) -> np.ndarray:
+        return await self.aembed_batch([query])
+
+    async def aembed_batch(self, queries) -> np.ndarray:
+        if self.aencode is None:
+            return self.embed_batch(queries)
+        return self._normalized(await self.aencode(list(queries)), len(queries))
+
+    @staticmethod
+    def _normalized(vectors, count) -> np.ndarray:
+        vectors = np.array(vectors, dtype="float32").reshape(count, -1)
+        faiss.normalize_L2(vectors)
+        return vectors
+
+    def _namespace(self, name, dim):
+        if name not in self._namespaces:
+            self._namespaces[name] = _Namespace(dim)
+        return self._namespaces[name]
+
+    def lookup(self, namespace: str, vector: np.ndarray):
+        """Return the stored answer closest to ``vector`` if it clears the threshold, else None."""
+        with self._lock:
+            ns = self._namespace(namespace, vector.shape[1])
+            if ns.index.ntotal:
+                with span("faiss_search"):
+                    scores, ids = ns.index.search(vector, 1)
+                entry_id = int(ids[0][0])
+                if entry_id != -1 and scores[0][0] >= self.threshold:
+                    ns.answers.move_to_end(entry_id)
+                    ns.hits += 1
+                    record_cache("semantic", True)
+                    return ns.answers[entry_id]
+            ns.misses += 1
+            record_cache("semantic", False)
+            return None
+
+    def store(self, namespace: str, vector: np.ndarray, answer):
+        with self._lock:
+            ns = self._namespace(namespace, vector.shape[1])
+            entry_id = ns.next_id
+            ns.next_id += 1
+            ns.index.add_with_ids(vector, np.array([entry_id], dtype="int64"))
+            ns.answers[entry_id] = answer
+
+            if len(ns.answers) > self.max_items:
+                evicted = []
+                while len(ns.answers) > self.max_items:
+                    evicted.append(ns.answers.popitem(last=False)[0])
+                ns.index.remove_ids(np.array(evicted, dtype="int64"))
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                name: {"hits": ns.hits, "misses": ns.misses, "size": len(ns.answers)}
+                for name, ns in self._namespaces.items()
+            }
@@ -0,0 +1,58 @@
+import asyncio
+
+from metrics import record_coalesced
+
+
+class _Call:
+    def __init__(self, task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Collapses concurrent identical calls into one execution.
+
+    Callers that arrive while a call for the same key is running await its result
+    (or its exception) instead of starting their own. Nothing is cached: once the
+    call finishes, the next caller starts a fresh one. A cancelled caller only
+    cancels the shared call when nobody else is waiting for it.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self._calls = {}  # key -> _Call
+
+    def _forget(self, key, call):
+        if self._calls.get(key) is call:
+            del self._calls[key]
+
+    def _finished(self, key, call, task):
+        self._forget(key, call)
+        # Mark the exception as retrieved when every waiter was cancelled before it was raised
+        if not task.cancelled():
+            task.exception()
+
+    async def do(self, key, fn, *args, **kwargs):
+        """Return ``await fn(*args, **kwargs)``, shared with concurrent callers using the same ``key``."""
+        call = self._calls.get(key)
+        if call is None:
+            call = _Call(asyncio.ensure_future(fn(*args, **kwargs)))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda task: self._finished(key, call, task))
+        else:
+            record_coalesced(self.name)
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        except asyncio.CancelledError:
+            if call.waiters == 1 and not call.task.done():
+                # Callers arriving from now on start a new call instead of joining this one
+                self._forget(key, call)
+                call.task.cancel()
+            raise
+        finally:
+            call.waiters -= 1
+
+    def in_flight(self) -> int:
+        return len(self._calls)
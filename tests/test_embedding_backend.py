@@ -0,0 +1,55 @@
+"""ONNX embedding backends against the fp32 SentenceTransformer reference."""
+import os
+
+import numpy as np
+import pytest
+
+pytest.importorskip("onnxruntime")
+pytest.importorskip("sentence_transformers")
+
+from embedding_backend import OnnxBackend, SentenceTransformerBackend, onnx_model_dir  # noqa: E402
+
+# Minimum per-text cosine similarity to the reference; quantization costs a little accuracy
+MIN_COSINE = {"onnx": 0.999, "onnx-int8": 0.98}
+
+TEXTS = [
+    # Course chunks, shaped like the catalog text that gets indexed
+    "Python for Beginners. Learn variables, loops, functions and files by building small command-line tools. "
+    "Level: Beginner. Benefits: write and debug your own scripts | automate everyday tasks.",
+    "Docker and Kubernetes in Practice. Package services into containers, write Compose files and deploy "
+    "them to a cluster with rolling updates. Prerequisites: basic Linux shell.",
+    "Machine Learning Foundations. Regression, classification, model evaluation and feature engineering "
+    "with scikit-learn, ending in a project on real data.",
+    # Queries, which are much shorter
+    "python courses",
+    "how do i deploy containers",
+    "intro to machine learning",
+]
+
+
+def cosine_rows(a, b):
+    a = a / np.clip(np.linalg.norm(a, axis=1, keepdims=True), 1e-12, None)
+    b = b / np.clip(np.linalg.norm(b, axis=1, keepdims=True), 1e-12, None)
+    return (a * b).sum(axis=1)
+
+
+@pytest.fixture(scope="module")
+def reference():
+    return SentenceTransformerBackend().encode(TEXTS)
+
+
+@pytest.mark.parametrize("kind", sorted(MIN_COSINE))
+def test_onnx_matches_reference(kind, request):
+    model_dir = onnx_model_dir()
+    model_file = "model-int8.onnx" if kind == "onnx-int8" else "model.onnx"
+    if not os.path.exists(os.path.join(model_dir, model_file)):
+        pytest.skip(f"No ONNX export in {model_dir}; run `python embedding_backend.py export` first")
+
+    reference = request.getfixturevalue("reference")  # Only load torch once an export is there to compare
+    vectors = OnnxBackend(model_dir, quantized=kind == "onnx-int8").encode(TEXTS)
+
+    assert vectors.shape == reference.shape
+    assert vectors.dtype == np.float32
+    similarity = cosine_rows(vectors, reference)
+    worst = int(similarity.argmin())
+    assert similarity.min() >= MIN_COSINE[kind], f"{kind}: cosine {similarity[worst]:.5f} for {TEXTS[worst]!r}"
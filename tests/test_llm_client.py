@@ -0,0 +1,144 @@
+"""LLMClient against the local fake Gemini server: retries, timeouts, concurrency and rate limits."""
+import asyncio
+import json
+import socket
+import time
+import urllib.request
+
+import pytest
+
+pytest.importorskip("google.generativeai")
+pytest.importorskip("uvicorn")
+
+import fake_gemini  # noqa: E402
+import llm_client  # noqa: E402
+from prompt_budget import Prompt  # noqa: E402
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def gemini(monkeypatch):
+    """Start a fake Gemini server with the given options and point llm_client at it; returns a stats getter."""
+    servers = []
+
+    def start(**options):
+        options.setdefault("jitter", 0.0)
+        port = free_port()
+        servers.append(fake_gemini.start_in_thread(port=port, **options))
+        endpoint = f"http://127.0.0.1:{port}"
+        monkeypatch.setattr(llm_client, "GEMINI_API_ENDPOINT", endpoint)
+        monkeypatch.setattr(llm_client, "GEMINI_TRANSPORT", "rest")
+
+        def stats():
+            with urllib.request.urlopen(f"{endpoint}/stats") as response:
+                return json.load(response)
+
+        return stats
+
+    yield start
+    for server in servers:
+        server.should_exit = True
+
+
+@pytest.fixture
+def fast_backoff(monkeypatch):
+    monkeypatch.setattr(llm_client, "GEMINI_BACKOFF_BASE", 0.01)
+    monkeypatch.setattr(llm_client, "GEMINI_BACKOFF_MAX", 0.05)
+
+
+def make_client(**kwargs):
+    client = llm_client.LLMClient(**kwargs)
+    client.configure("fake-key")
+    return client
+
+
+def test_generate_text(gemini):
+    gemini(latency=0.0, words=20)
+    text = asyncio.run(make_client().generate_text("Tell me about 'python'"))
+    assert text.startswith("About python")
+    assert not text.truncated
+
+
+def test_output_budget_marks_truncation(gemini):
+    gemini(latency=0.0, words=120)
+    prompt = Prompt("ask_general", "Answer briefly.", "What is 'python'?", max_output_tokens=15)
+    text = asyncio.run(make_client().generate_text(prompt))
+    assert text.truncated
+    assert llm_client.is_truncated(text)
+
+
+def test_retries_transient_errors_with_jittered_backoff(gemini, fast_backoff, monkeypatch):
+    stats = gemini(latency=0.0, error_rate=1.0)
+    bounds = []
+    uniform = llm_client.random.uniform
+
+    def recording_uniform(low, high):
+        bounds.append((low, high))
+        return uniform(low, high)
+
+    monkeypatch.setattr(llm_client.random, "uniform", recording_uniform)
+
+    with pytest.raises(llm_client.RETRYABLE_ERRORS):
+        asyncio.run(make_client(retries=3).generate_text("hello"))
+
+    assert stats()["calls"] == 4  # the first attempt plus three retries
+    # Full jitter: each delay is drawn from [0, base * 2**attempt], capped at the maximum
+    assert bounds == [(0, min(0.05, 0.01 * 2 ** attempt)) for attempt in range(3)]
+
+
+def test_times_out_slow_calls(gemini, fast_backoff):
+    stats = gemini(latency=2.0)
+    started = time.perf_counter()
+    with pytest.raises(llm_client.RETRYABLE_ERRORS):
+        asyncio.run(make_client(timeout=0.2, retries=1).generate_text("hello"))
+    elapsed = time.perf_counter() - started
+
+    assert elapsed < 1.5  # two 0.2 s attempts, not the server's 2 s latency
+    assert stats()["calls"] == 2
+
+
+def test_bounds_concurrent_calls(gemini):
+    stats = gemini(latency=0.2)
+    client = make_client(max_concurrency=2)
+
+    async def burst():
+        return await asyncio.gather(*(client.generate_text(f"question {i}") for i in range(6)))
+
+    started = time.perf_counter()
+    answers = asyncio.run(burst())
+    elapsed = time.perf_counter() - started
+
+    assert len(answers) == 6
+    assert stats()["max_in_flight"] == 2
+    assert elapsed >= 0.55  # three waves of two
+
+
+def test_stream_reports_truncation(gemini):
+    gemini(latency=0.0, chunk_delay=0.0, words=120)
+    prompt = Prompt("get_roadmap", "Write a roadmap.", "Roadmap for 'python'", max_output_tokens=15)
+    finish = {}
+
+    async def collect():
+        return [chunk async for chunk in make_client().stream_text(prompt, on_finish=finish.update)]
+
+    chunks = asyncio.run(collect())
+    assert "".join(chunks).strip()
+    assert finish == {"truncated": True}
+
+
+def test_token_bucket_spaces_calls():
+    bucket = llm_client.TokenBucket(rate=10, capacity=1)
+
+    async def acquire(times):
+        for _ in range(times):
+            await bucket.acquire()
+
+    started = time.perf_counter()
+    asyncio.run(acquire(4))
+    # One token is available up front, the other three arrive 0.1 s apart
+    assert time.perf_counter() - started >= 0.28